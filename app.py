@@ -1,250 +1,332 @@
 from flask import Flask, render_template, request, jsonify
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
+import hashlib
+import heapq
+import math
 import os
-import requests
-import pandas as pd
+import re
+import threading
+import time
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
 import io
-from werkzeug.utils import secure_filename
-from trade import (read_option_chain, find_max_put_oi_strike, analyze_calls, analyze_puts, 
-                  analyze_otm_calls, analyze_market_direction, analyze_best_trades, 
-                  analyze_price_imbalances, fetch_fno_stocks, fetch_volume_data, 
-                  analyze_volume_signals, get_enhanced_option_chain, fetch_market_news)
+import orjson
+from trade import (read_option_chain, get_enhanced_option_chain, get_stock_sector,
+                  analyze_option_chain, INDEX_SYMBOLS, nse_get, ttl_cache, UNKNOWN_SECTOR)
+
+class ORJSONProvider(JSONProvider):
+    """JSON provider backed by orjson, also serializing sets as sorted lists"""
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (set, frozenset)):
+            return sorted(o)
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # orjson already produces bytes, so skip the str round-trip of dumps()
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.option)
+        return self._app.response_class(body, mimetype='application/json')
 
 app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = 'uploads'
+app.json = ORJSONProvider(app)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
-# Ensure upload folder exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Compress responses; option chain JSON is highly repetitive and shrinks ~10x
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+# Only the page and the JSON API are served here, so only check those
+app.config['COMPRESS_MIMETYPES'] = ['text/html', 'application/json']
+app.config['COMPRESS_LEVEL'] = 4
+app.config['COMPRESS_BR_LEVEL'] = 4
+app.config['COMPRESS_MIN_SIZE'] = 1024
+Compress(app)
 
-ALLOWED_EXTENSIONS = {'csv'}
+ALLOWED_SUFFIXES = ('.csv',)
 
-# Add indices
-INDICES = ["NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY"]
+# Add indices, ordered for the dropdown
+INDICES = ("NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY")
+
+# Served when NSE is unreachable and no list has been fetched yet
+FALLBACK_FNO_STOCKS = [
+    "RELIANCE", "TCS", "INFY", "HDFCBANK", "ICICIBANK", "HDFC", "KOTAKBANK",
+    "LT", "AXISBANK", "SBIN", "BHARTIARTL", "ITC", "HCLTECH", "TITAN",
+    "BAJFINANCE", "ASIANPAINT", "MARUTI", "SUNPHARMA", "TATAMOTORS",
+    "ULTRACEMCO", "WIPRO", "HINDUNILVR", "ADANIENT", "TATASTEEL", "BAJAJFINSV",
+    "M&M", "TECHM", "POWERGRID", "NTPC", "ONGC", "GRASIM", "HINDALCO",
+    "JSWSTEEL", "APOLLOHOSP", "CIPLA", "EICHERMOT", "COALINDIA", "DRREDDY",
+    "BPCL", "UPL"
+]
 
 def get_fno_stocks():
-    """Fetch current F&O stocks list from NSE"""
+    """Fetch current F&O stocks list from NSE, returning None on failure"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        session = requests.Session()
-        # Get cookies first
-        session.get("https://www.nseindia.com", headers=headers)
-        
         # Fetch F&O stocks list
         url = "https://www.nseindia.com/api/equity-stock-derivatives"
-        response = session.get(url, headers=headers)
+        response = nse_get(url)
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             # Extract symbols from the response
             fno_stocks = [stock['symbol'] for stock in data]
-            return sorted(fno_stocks)
-        else:
-            # Fallback to a basic list if API fails
-            return [
-                "RELIANCE", "TCS", "INFY", "HDFCBANK", "ICICIBANK", "HDFC", "KOTAKBANK",
-                "LT", "AXISBANK", "SBIN", "BHARTIARTL", "ITC", "HCLTECH", "TITAN",
-                "BAJFINANCE", "ASIANPAINT", "MARUTI", "SUNPHARMA", "TATAMOTORS",
-                "ULTRACEMCO", "WIPRO", "HINDUNILVR", "ADANIENT", "TATASTEEL", "BAJAJFINSV",
-                "M&M", "TECHM", "POWERGRID", "NTPC", "ONGC", "GRASIM", "HINDALCO",
-                "JSWSTEEL", "APOLLOHOSP", "CIPLA", "EICHERMOT", "COALINDIA", "DRREDDY",
-                "BPCL", "UPL"
-            ]
+            fno_stocks.sort()
+            return fno_stocks
+        print(f"Error fetching F&O stocks: HTTP {response.status_code}")
     except Exception as e:
         print(f"Error fetching F&O stocks: {e}")
-        # Return a basic list as fallback
-        return [
-            "RELIANCE", "TCS", "INFY", "HDFCBANK", "ICICIBANK", "HDFC", "KOTAKBANK",
-            "LT", "AXISBANK", "SBIN", "BHARTIARTL", "ITC", "HCLTECH", "TITAN",
-            "BAJFINANCE", "ASIANPAINT", "MARUTI", "SUNPHARMA", "TATAMOTORS",
-            "ULTRACEMCO", "WIPRO", "HINDUNILVR", "ADANIENT", "TATASTEEL", "BAJAJFINSV"
-        ]
+    return None
 
-# Get F&O stocks list once at the start
-FNO_STOCKS = get_fno_stocks()
+# The F&O constituent list changes monthly at most, so refetch it every 30
+# minutes; after a failed fetch, retry sooner while serving the last good list
+FNO_CACHE_TTL = 1800
+FNO_RETRY_DELAY = 60
+FALLBACK_SYMBOLS = (*INDICES, *FALLBACK_FNO_STOCKS)
+_fno_cache = {'expires_at': float('-inf'), 'symbols': None}
+_fno_lock = threading.Lock()
 
-# Combined list for dropdown
-SYMBOLS = INDICES + FNO_STOCKS
+def _refresh_fno_cache():
+    """Refetch the F&O list once the cache has expired"""
+    if time.monotonic() < _fno_cache['expires_at']:
+        return
+    # Only the very first load waits for a refresh already in progress;
+    # once there is a list, other requests keep serving it meanwhile
+    if not _fno_lock.acquire(blocking=_fno_cache['symbols'] is None):
+        return
+    try:
+        # Another thread may have refreshed it while we waited for the lock
+        now = time.monotonic()
+        if now < _fno_cache['expires_at']:
+            return
+        stocks = get_fno_stocks()
+        if stocks:
+            # The dropdown list only changes here, so build it once per refresh
+            _fno_cache['symbols'] = (*INDICES, *stocks)
+            _fno_cache['expires_at'] = now + FNO_CACHE_TTL
+        else:
+            # Keep the stale list rather than dropping to the fallback
+            _fno_cache['expires_at'] = now + FNO_RETRY_DELAY
+    finally:
+        _fno_lock.release()
+
+def get_cached_symbols():
+    """Return the indices followed by the F&O stocks, for the dropdown"""
+    _refresh_fno_cache()
+    return _fno_cache['symbols'] or FALLBACK_SYMBOLS
+
+# NSE tickers are upper-case letters, digits, '&' and '-' (e.g. M&M, BAJAJ-AUTO)
+SYMBOL_PATTERN = re.compile(r'[A-Z0-9&-]{1,20}')
+
+def get_request_symbol():
+    """Return the normalized symbol from a JSON POST body, or None if invalid"""
+    data = request.get_json(silent=True)
+    symbol = data.get('symbol') if isinstance(data, dict) else None
+    if not isinstance(symbol, str):
+        return None
+    symbol = symbol.strip().upper()
+    return symbol if SYMBOL_PATTERN.fullmatch(symbol) else None
 
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(ALLOWED_SUFFIXES)
+
+# Browsers may reuse the page this long before revalidating with its ETag
+INDEX_MAX_AGE = 300
+
+@lru_cache(maxsize=4)
+def _index_etag(symbols):
+    """ETag for the index page, covering both the template and the symbol list"""
+    source, _, _ = app.jinja_env.loader.get_source(app.jinja_env, 'index.html')
+    return hashlib.md5(f"{source}{symbols!r}".encode()).hexdigest()
 
 @app.route('/')
 def index():
-    # Refresh F&O stocks list when loading the page
-    global FNO_STOCKS, SYMBOLS
-    FNO_STOCKS = get_fno_stocks()
-    SYMBOLS = INDICES + FNO_STOCKS
-    return render_template('index.html', symbols=SYMBOLS)
+    # Served from the cache; only refetched from NSE once the TTL expires
+    symbols = get_cached_symbols()
+    etag = _index_etag(symbols)
+    if request.if_none_match.contains(etag):
+        # The browser already has this exact page, so skip rendering it
+        response = app.response_class(status=304)
+    else:
+        response = app.make_response(render_template('index.html', symbols=symbols))
+    response.set_etag(etag)
+    response.cache_control.max_age = INDEX_MAX_AGE
+    return response
+
+# Quote refreshes come in bursts; serve repeats within this window from memory
+CURRENT_PRICE_CACHE_TTL = 3
+
+@ttl_cache(ttl=CURRENT_PRICE_CACHE_TTL, maxsize=512)
+def get_underlying_price(symbol):
+    """Fetch the underlying value for a symbol from its NSE option chain"""
+    # Different URL format for indices vs stocks
+    if symbol in INDEX_SYMBOLS:
+        url = "https://www.nseindia.com/api/option-chain-indices"
+    else:
+        url = "https://www.nseindia.com/api/option-chain-equities"
+        
+    response = nse_get(url, {'symbol': symbol})
+    
+    if response.status_code != 200:
+        raise RuntimeError(f'Failed to fetch data: {response.status_code}')
+    
+    data = orjson.loads(response.content)
+    return data['records']['underlyingValue']
 
 @app.route('/get_current_price', methods=['POST'])
 def get_current_price():
-    symbol = request.json.get('symbol')
+    symbol = get_request_symbol()
     if not symbol:
-        return jsonify({'error': 'Symbol is required'}), 400
+        return jsonify({'error': 'A valid symbol is required'}), 400
     
     try:
-        # For demonstration, we'll use a simple API to get the current price
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        # Different URL format for indices vs stocks
-        if symbol in INDICES:
-            url = f"https://www.nseindia.com/api/option-chain-indices?symbol={symbol}"
-        else:
-            url = f"https://www.nseindia.com/api/option-chain-equities?symbol={symbol}"
-            
-        # This is a simplified example - in production you'd need proper session handling
-        session = requests.Session()
-        session.get("https://www.nseindia.com", headers=headers)  # Get cookies
-        response = session.get(url, headers=headers)
-        
-        if response.status_code == 200:
-            data = response.json()
-            current_price = data['records']['underlyingValue']
-            return jsonify({'current_price': current_price})
-        else:
-            return jsonify({'error': f'Failed to fetch data: {response.status_code}'}), 500
+        return jsonify({'current_price': get_underlying_price(symbol)})
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/fetch_option_chain', methods=['POST'])
-def fetch_option_chain():
-    symbol = request.json.get('symbol')
-    if not symbol:
-        return jsonify({'error': 'Symbol is required'}), 400
+@app.route('/analyze', methods=['POST'])
+def analyze():
+    file = request.files.get('file')
+    if not file or not allowed_file(file.filename):
+        return jsonify({'error': 'Please upload a CSV file'}), 400
     
     try:
-        # Get enhanced option chain with volume data and news
-        option_data = get_enhanced_option_chain(symbol)
-        
-        if not option_data['success']:
-            return jsonify({'error': option_data.get('error', 'Failed to fetch data')}), 500
-            
-        current_price = option_data['current_price']
-        option_chain_data = option_data['option_chain']
-        volume_signals = option_data['volume_signals']
-        volume_data = option_data['volume_data']
-        news_data = option_data['news_data']
-        
-        # Get market news for broader context
-        market_news = fetch_market_news()
-        
-        # Get the sector for the stock
-        sector = get_stock_sector(symbol)
-        
-        # Analyze the data
-        market_direction = analyze_market_direction(option_chain_data, current_price)
-        
-        # Get all possible trades first
-        all_possible_trades = []
-        
-        # Process each strike price for valid trades
-        for opt in option_chain_data:
-            strike_price = opt['strike']
-            price_diff_pct = (strike_price - current_price) / current_price
-            
-            # Check CALL options
-            if (opt['call_volume'] > 0 and opt['call_oi'] > 0 and 
-                opt['call_ltp'] > 0 and abs(price_diff_pct) <= 0.10):
-                
-                call_spread = opt['call_ask'] - opt['call_bid']
-                call_spread_pct = call_spread / opt['call_ltp'] if opt['call_ltp'] > 0 else float('inf')
-                
-                if call_spread_pct < 0.10:
-                    trade = {
-                        'type': 'CALL',
-                        'strike': strike_price,
-                        'buy_price': opt['call_ask'],
-                        'current_price': opt['call_ltp'],
-                        'exit': opt['call_ask'] * 1.5,
-                        'stop_loss': opt['call_bid'] * 0.7,
-                        'oi': opt['call_oi'],
-                        'oi_change': opt['call_oi_chng'],
-                        'volume': opt['call_volume'],
-                        'iv': opt['call_iv'],
-                        'distance': f"{price_diff_pct * 100:.1f}%",
-                        'spread': f"{call_spread_pct * 100:.1f}%"
-                    }
-                    all_possible_trades.append(trade)
-            
-            # Check PUT options with similar logic
-            if (opt['put_volume'] > 0 and opt['put_oi'] > 0 and 
-                opt['put_ltp'] > 0 and abs(price_diff_pct) <= 0.10):
-                
-                put_spread = opt['put_ask'] - opt['put_bid']
-                put_spread_pct = put_spread / opt['put_ltp'] if opt['put_ltp'] > 0 else float('inf')
-                
-                if put_spread_pct < 0.10:
-                    trade = {
-                        'type': 'PUT',
-                        'strike': strike_price,
-                        'buy_price': opt['put_ask'],
-                        'current_price': opt['put_ltp'],
-                        'exit': opt['put_ask'] * 1.5,
-                        'stop_loss': opt['put_bid'] * 0.7,
-                        'oi': opt['put_oi'],
-                        'oi_change': opt['put_oi_chng'],
-                        'volume': opt['put_volume'],
-                        'iv': opt['put_iv'],
-                        'distance': f"{price_diff_pct * 100:.1f}%",
-                        'spread': f"{put_spread_pct * 100:.1f}%"
-                    }
-                    all_possible_trades.append(trade)
-        
-        # Get the best trades using existing analysis
-        best_trades = analyze_best_trades(option_chain_data, current_price, volume_signals)
-        imbalance_trades = analyze_price_imbalances(option_chain_data, current_price)
-        
-        # Initialize lists for different types of trades
-        high_potential_trades = []
+        current_price = float(request.form.get('currentPrice', ''))
+    except ValueError:
+        current_price = 0
+    if not math.isfinite(current_price) or current_price <= 0:
+        return jsonify({'error': 'A valid current price is required'}), 400
+    
+    try:
+        # Parse the upload straight from its in-memory stream instead of
+        # saving it to disk, reading it back and deleting it
+        try:
+            options = read_option_chain(io.TextIOWrapper(file.stream, encoding='utf-8'))
+        except UnicodeDecodeError:
+            return jsonify({'error': 'The file must be a UTF-8 encoded CSV'}), 400
+        if not options:
+            return jsonify({'error': 'No valid data found in the file'}), 400
         
-        # Safely extend high_potential_trades with available trades
-        if best_trades and 'best_overall' in best_trades and best_trades['best_overall']:
-            high_potential_trades.extend(best_trades['best_overall'])
-        if best_trades and 'best_atm' in best_trades and best_trades['best_atm']:
-            high_potential_trades.extend(best_trades['best_atm'])
-        if best_trades and 'best_otm' in best_trades and best_trades['best_otm']:
-            high_potential_trades.extend(best_trades['best_otm'])
-        if imbalance_trades:
-            high_potential_trades.extend(imbalance_trades[:2])
+        analysis = analyze_option_chain(options, current_price, imbalance_limit=3)
+        market_direction = analysis['market_direction']
+        best_trades = analysis['best_trades']
+        imbalance_trades = analysis['imbalance_trades']
         
-        # Sort high potential trades if we have any
-        if high_potential_trades:
-            high_potential_trades.sort(key=lambda x: x['score'], reverse=True)
-            
-            # Get trades aligned with market direction, news sentiment, and sector trend
-            sector_sentiment = 'Neutral'
-            if market_news['success']:
-                sector_sentiment = market_news['sector_sentiment']
-            
-            high_potential_trades.append({
-                'type': 'SECTOR SENTIMENT',
-                'sentiment': sector_sentiment
-            })
+        if best_trades['best_overall']:
+            best_trade = dict(best_trades['best_overall'][0])
+            best_trade['recommendation'] = (f"Buy {best_trade['type']} {best_trade['strike']:g} "
+                                            f"at ₹{best_trade['buy_price']:.2f}")
+        else:
+            best_trade = {'recommendation': 'No trade meets the criteria', 'score': 0}
         
-        # Prepare results for front end
-        results = {
-            'symbol': symbol,
+        return jsonify({
             'current_price': current_price,
-            'option_chain_data': option_chain_data,
             'market_direction': market_direction,
-            'high_potential_trades': high_potential_trades,
-            'volume_signals': volume_signals,
-            'volume_data': volume_data,
-            'news_data': news_data,
-            'market_news': market_news
-        }
+            'best_trade': best_trade,
+            'best_trades': best_trades,
+            'imbalance_trades': imbalance_trades
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Option chains refresh every few seconds on NSE; within this window repeat
+# requests for a symbol are served from memory instead of re-fetching
+OPTION_CHAIN_CACHE_TTL = 15
+
+# Number of top-scoring trades shown in the high potential list
+HIGH_POTENTIAL_LIMIT = 10
+
+@ttl_cache(ttl=OPTION_CHAIN_CACHE_TTL, maxsize=256)
+def get_option_chain_results(symbol):
+    """Fetch and analyze the option chain, news and volume data for a symbol"""
+    # Get enhanced option chain with volume data and news
+    option_data = get_enhanced_option_chain(symbol)
+    
+    if not option_data['success']:
+        raise RuntimeError(option_data.get('error', 'Failed to fetch data'))
+        
+    current_price = option_data['current_price']
+    option_chain_data = option_data['option_chain']
+    volume_signals = option_data['volume_signals']
+    volume_data = option_data['volume_data']
+    news_data = option_data['news_data']
+    
+    # Market news for broader context was fetched alongside the chain
+    market_news = option_data['market_news']
+    
+    # Get the sector for the stock
+    sector = get_stock_sector(symbol)
+    
+    # Analyze the data
+    analysis = analyze_option_chain(option_chain_data, current_price, volume_signals,
+                                    imbalance_limit=2)
+    market_direction = analysis['market_direction']
+    best_trades = analysis['best_trades']
+    imbalance_trades = analysis['imbalance_trades']
+    
+    # Merge candidates from both analyses in a single pass. best_overall is
+    # always the top entry of best_atm or best_otm, so it is not added again
+    candidates = chain(
+        best_trades.get('best_atm') or [],
+        best_trades.get('best_otm') or [],
+        imbalance_trades
+    )
+    high_potential_trades = heapq.nlargest(HIGH_POTENTIAL_LIMIT, candidates, key=itemgetter('score'))
+    
+    if high_potential_trades:
+        # Sector trend for the stock, from the market news
+        sector_sentiment = 'Neutral'
+        # Unmapped stocks share the catch-all sector, whose sentiment says
+        # nothing about this particular symbol
+        sector_data = None
+        if sector != UNKNOWN_SECTOR:
+            sector_data = market_news.get('sector_analysis', {}).get(sector)
+        if sector_data:
+            sector_sentiment = sector_data['sentiment']
         
-        return jsonify(results)
+        high_potential_trades.append({
+            'type': 'SECTOR SENTIMENT',
+            'sentiment': sector_sentiment
+        })
+    
+    # Prepare results for front end
+    results = {
+        'symbol': symbol,
+        'current_price': current_price,
+        'option_chain_data': option_chain_data,
+        'market_direction': market_direction,
+        'high_potential_trades': high_potential_trades,
+        'volume_signals': volume_signals,
+        'volume_data': volume_data,
+        'news_data': news_data,
+        'market_news': market_news
+    }
+    
+    return results
+
+@app.route('/fetch_option_chain', methods=['POST'])
+def fetch_option_chain():
+    symbol = get_request_symbol()
+    if not symbol:
+        return jsonify({'error': 'A valid symbol is required'}), 400
+    
+    try:
+        return jsonify(get_option_chain_results(symbol))
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000))  # Use Render's PORT variable
-    app.run(host='0.0.0.0', port=port)
+    # Production runs under gunicorn (see gunicorn.conf.py); keep local runs
+    # concurrent as well so slow NSE calls don't block other requests
+    app.run(host='0.0.0.0', port=port, threaded=True)
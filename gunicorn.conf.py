@@ -0,0 +1,11 @@
+# Gunicorn settings, loaded automatically from the working directory
+import os
+
+# Requests spend nearly all their time waiting on NSE, so threaded workers
+# serve many of them concurrently for little extra memory
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+keepalive = 5
+timeout = 60
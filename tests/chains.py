@@ -0,0 +1,48 @@
+"""Random option chains for the tests."""
+import random
+from typing import Dict, List, Tuple
+
+def random_chain(n: int, seed: int, current_price: float = 20000) -> Tuple[List[Dict], float]:
+    """Build n option rows spread over ±20% of current_price."""
+    rng = random.Random(seed)
+    options = []
+    for k in range(n):
+        row = {'strike': current_price * 0.8 + k * current_price * 0.4 / n}
+        for side in ('call', 'put'):
+            ltp = rng.choice([0, rng.uniform(1, 500)])
+            row.update({
+                f'{side}_oi': rng.choice([0, rng.randint(1, 200000)]),
+                f'{side}_oi_chng': rng.randint(-5000, 20000),
+                f'{side}_volume': rng.choice([0, rng.randint(1, 100000)]),
+                f'{side}_iv': rng.uniform(0, 60),
+                f'{side}_ltp': ltp,
+                f'{side}_chng': rng.uniform(-10, 10),
+                f'{side}_bid': max(ltp - rng.uniform(0, 30), 0),
+                f'{side}_ask': ltp + rng.uniform(0, 30),
+            })
+        options.append(row)
+    return options, current_price
+
+def to_nse_csv(options: List[Dict]) -> str:
+    """Write option rows in the layout of the NSE option chain CSV export."""
+    def cell(value):
+        if isinstance(value, float):
+            return f"{value:,.2f}"
+        return f"{value:,}" if value else '-'
+
+    lines = [
+        "CALLS,,,,,,,,,,,,PUTS",
+        "OI,CHNG IN OI,VOLUME,IV,LTP,CHNG,BID QTY,BID,ASK,ASK QTY,STRIKE,"
+        "BID QTY,BID,ASK,ASK QTY,CHNG,LTP,IV,VOLUME,CHNG IN OI,OI,",
+    ]
+    for opt in options:
+        row = [''] * 23
+        row[1], row[2], row[3] = cell(opt['call_oi']), cell(opt['call_oi_chng']), cell(opt['call_volume'])
+        row[4], row[5], row[6] = cell(opt['call_iv']), cell(opt['call_ltp']), cell(opt['call_chng'])
+        row[7], row[8], row[9], row[10] = '50', cell(opt['call_bid']), cell(opt['call_ask']), '50'
+        row[11] = cell(opt['strike'])
+        row[12], row[13], row[14], row[15] = '50', cell(opt['put_bid']), cell(opt['put_ask']), '50'
+        row[16], row[17], row[18] = cell(opt['put_chng']), cell(opt['put_ltp']), cell(opt['put_iv'])
+        row[19], row[20], row[21] = cell(opt['put_volume']), cell(opt['put_oi_chng']), cell(opt['put_oi'])
+        lines.append(','.join(f'"{value}"' for value in row))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,498 @@
+"""Loop implementations of the chain analyses, as they stood before they were
+rewritten on NumPy arrays.
+
+The equivalence tests run these next to trade.py on random chains; keep
+them unchanged so any drift in the vectorized versions shows up.
+"""
+import csv
+from typing import Dict, List
+
+
+def parse_number(value: str, num_type=float):
+    """Convert CSV string (with commas or '-') to int/float."""
+    if value.strip() in ('-', ''):
+        return 0
+    try:
+        cleaned = value.replace(',', '')
+        return num_type(cleaned)
+    except:
+        return 0
+
+def read_option_chain(file_path: str) -> List[Dict]:
+    """Reads the option chain CSV and returns structured data."""
+    options = []
+    with open(file_path, 'r') as f:
+        reader = csv.reader(f)
+        next(reader)  # Skip header row
+        next(reader)  # Skip subheader row
+        
+        for row in reader:
+            if len(row) < 21:  # Basic validation
+                continue
+                
+            # CALLS (left side)
+            call_oi = parse_number(row[1], int)
+            call_oi_chng = parse_number(row[2], int)
+            call_volume = parse_number(row[3], int)
+            call_iv = parse_number(row[4])
+            call_ltp = parse_number(row[5])
+            call_chng = parse_number(row[6])
+            call_bid = parse_number(row[8])
+            call_ask = parse_number(row[9])
+            
+            # Strike Price (middle)
+            strike = parse_number(row[11])
+            
+            # PUTS (right side)
+            put_bid = parse_number(row[13])
+            put_ask = parse_number(row[14])
+            put_chng = parse_number(row[16])
+            put_ltp = parse_number(row[17])
+            put_iv = parse_number(row[18])
+            put_volume = parse_number(row[19])
+            put_oi_chng = parse_number(row[20], int)
+            put_oi = parse_number(row[21], int)
+            
+            options.append({
+                'strike': strike,
+                'call_oi': call_oi,
+                'call_oi_chng': call_oi_chng,
+                'call_volume': call_volume,
+                'call_iv': call_iv,
+                'call_ltp': call_ltp,
+                'call_chng': call_chng,
+                'call_bid': call_bid,
+                'call_ask': call_ask,
+                'put_oi': put_oi,
+                'put_oi_chng': put_oi_chng,
+                'put_volume': put_volume,
+                'put_iv': put_iv,
+                'put_ltp': put_ltp,
+                'put_chng': put_chng,
+                'put_bid': put_bid,
+                'put_ask': put_ask,
+            })
+    return options
+
+def find_max_put_oi_strike(options: List[Dict]) -> float:
+    """Identify the strike with the highest PUT OI."""
+    max_oi = -1
+    key_strike = 0
+    for opt in options:
+        if opt['put_oi'] > max_oi:
+            max_oi = opt['put_oi']
+            key_strike = opt['strike']
+    return key_strike
+
+def analyze_calls(options: List[Dict], current_price: float) -> List[Dict]:
+    """Filter CALL options with high OI change, volume and tight spreads."""
+    candidates = []
+    for opt in options:
+        # Only consider strikes near the current price (within ±5%)
+        if abs(opt['strike'] - current_price) / current_price <= 0.05:
+            if (opt['call_oi_chng'] > 0 and 
+                opt['call_volume'] > 1000 and 
+                opt['call_ltp'] > 0):
+                
+                spread = opt['call_ask'] - opt['call_bid']
+                spread_percentage = spread / opt['call_ltp'] * 100
+                
+                if spread_percentage < 5:
+                    candidates.append({
+                        'strike': opt['strike'],
+                        'buy_price': opt['call_ask'],
+                        'exit': opt['call_ask'] * 1.5,
+                        'stop_loss': opt['call_bid'] * 0.7,
+                        'oi_chng': opt['call_oi_chng'],
+                        'volume': opt['call_volume'],
+                        'iv': opt['call_iv'],
+                        'reason': f"OI Change: {opt['call_oi_chng']}, Volume: {opt['call_volume']}"
+                    })
+    
+    candidates.sort(key=lambda x: (x['oi_chng'], x['volume']), reverse=True)
+    return candidates
+
+def analyze_puts(options: List[Dict], current_price: float) -> List[Dict]:
+    """Filter PUT options with high OI change and volume."""
+    candidates = []
+    for opt in options:
+        # Only consider strikes near the current price (within ±5%)
+        if abs(opt['strike'] - current_price) / current_price <= 0.05:
+            if (opt['put_oi_chng'] > 0 and 
+                opt['put_volume'] > 1000 and
+                opt['put_ltp'] > 0):
+                
+                spread = opt['put_ask'] - opt['put_bid']
+                spread_percentage = spread / opt['put_ltp'] * 100
+                
+                if spread_percentage < 5:
+                    candidates.append({
+                        'strike': opt['strike'],
+                        'buy_price': opt['put_ask'],
+                        'exit': opt['put_ask'] * 1.5,
+                        'stop_loss': opt['put_bid'] * 0.7,
+                        'oi_chng': opt['put_oi_chng'],
+                        'volume': opt['put_volume'],
+                        'iv': opt['put_iv'],
+                        'reason': f"OI Change: {opt['put_oi_chng']}, Volume: {opt['put_volume']}"
+                    })
+    
+    candidates.sort(key=lambda x: (x['oi_chng'], x['volume']), reverse=True)
+    return candidates
+
+def analyze_otm_calls(options: List[Dict], current_price: float) -> List[Dict]:
+    """Identify OTM CALLs based on current price."""
+    candidates = []
+    for opt in options:
+        # Consider strikes 2-10% above current price for OTM calls
+        if 1.02 * current_price <= opt['strike'] <= 1.10 * current_price:
+            if opt['call_oi_chng'] > 0:
+                spread = opt['call_ask'] - opt['call_bid']
+                if spread < 2.0:
+                    candidates.append({
+                        'strike': opt['strike'],
+                        'buy_price': opt['call_ask'],
+                        'exit': opt['call_ask'] * 2,
+                        'stop_loss': opt['call_bid'] * 0.7,
+                        'oi_chng': opt['call_oi_chng'],
+                        'volume': opt['call_volume'],
+                        'iv': opt['call_iv'],
+                        'reason': f"OTM with OI buildup, Volume: {opt['call_volume']}"
+                    })
+    candidates.sort(key=lambda x: x['oi_chng'], reverse=True)
+    return candidates
+
+def analyze_market_direction(options: List[Dict], current_price: float) -> Dict:
+    """Analyze market direction based on option chain data."""
+    call_oi_sum = 0
+    put_oi_sum = 0
+    call_volume_sum = 0
+    put_volume_sum = 0
+    max_call_oi = {'strike': 0, 'oi': 0}
+    max_put_oi = {'strike': 0, 'oi': 0}
+    
+    for opt in options:
+        # Consider only strikes within ±5% of current price
+        if abs(opt['strike'] - current_price) / current_price <= 0.05:
+            call_oi_sum += opt['call_oi']
+            put_oi_sum += opt['put_oi']
+            call_volume_sum += opt['call_volume']
+            put_volume_sum += opt['put_volume']
+            
+            if opt['call_oi'] > max_call_oi['oi']:
+                max_call_oi = {'strike': opt['strike'], 'oi': opt['call_oi']}
+            if opt['put_oi'] > max_put_oi['oi']:
+                max_put_oi = {'strike': opt['strike'], 'oi': opt['put_oi']}
+
+    pcr = put_oi_sum / call_oi_sum if call_oi_sum > 0 else 0
+    volume_ratio = put_volume_sum / call_volume_sum if call_volume_sum > 0 else 0
+    
+    # Determine market bias
+    bias = "Neutral"
+    target_price = current_price
+    confidence = 0
+    reason = []
+    
+    if pcr > 1.5:
+        bias = "Bullish"
+        confidence += 30
+        reason.append("High Put-Call Ratio indicates potential reversal")
+    elif pcr < 0.7:
+        bias = "Bearish"
+        confidence += 30
+        reason.append("Low Put-Call Ratio indicates potential reversal")
+        
+    if volume_ratio > 1.2:
+        if bias == "Bearish":
+            confidence += 20
+        reason.append("Higher Put volume indicates bearish sentiment")
+    elif volume_ratio < 0.8:
+        if bias == "Bullish":
+            confidence += 20
+        reason.append("Higher Call volume indicates bullish sentiment")
+    
+    # Target price calculation
+    if bias == "Bullish":
+        target_price = max(max_call_oi['strike'], current_price * 1.01)
+    elif bias == "Bearish":
+        target_price = min(max_put_oi['strike'], current_price * 0.99)
+        
+    return {
+        'bias': bias,
+        'confidence': min(confidence, 100),
+        'target_price': target_price,
+        'pcr': pcr,
+        'reason': '. '.join(reason),
+        'max_call_oi_strike': max_call_oi['strike'],
+        'max_put_oi_strike': max_put_oi['strike']
+    }
+
+def analyze_best_trades(options: List[Dict], current_price: float, volume_signals: Dict = None) -> Dict:
+    """Analyze and select the best trading opportunities with volume data."""
+    atm_range = 0.02  # 2% range for ATM
+    otm_range = (0.02, 0.10)  # 2-10% range for OTM
+    
+    # Initialize containers for opportunities
+    atm_opportunities = []
+    otm_opportunities = []
+    
+    # Volume bias factor (default to neutral if no volume data)
+    volume_bias = 0
+    if volume_signals:
+        volume_bias = volume_signals.get('volume_score', 0)
+    
+    for opt in options:
+        price_diff_pct = (opt['strike'] - current_price) / current_price
+        
+        # ATM Analysis (within ±2% of current price)
+        if abs(price_diff_pct) <= atm_range:
+            # Analyze CALL side
+            if opt['call_oi_chng'] > 0 and opt['call_volume'] > 1000:
+                call_spread = opt['call_ask'] - opt['call_bid']
+                call_spread_pct = call_spread / opt['call_ltp'] if opt['call_ltp'] > 0 else float('inf')
+                
+                if call_spread_pct < 0.05:  # 5% spread threshold
+                    # Add market bias factor to score
+                    market_bias_factor = 1.2 if price_diff_pct < 0 else 0.9  # Favor ITM calls
+                    
+                    # Calculate volume to OI ratio (higher is better)
+                    vol_oi_ratio = opt['call_volume'] / opt['call_oi'] if opt['call_oi'] > 0 else 0
+                    
+                    # Add volume bias to score (positive volume bias boosts calls)
+                    volume_factor = 1 + (volume_bias / 20) if volume_bias > 0 else 1
+                    
+                    # Enhanced score calculation with volume factor
+                    enhanced_score = calculate_score(
+                        opt['call_oi_chng'], 
+                        opt['call_volume'], 
+                        call_spread_pct, 
+                        opt['call_iv']
+                    ) * market_bias_factor * (1 + min(vol_oi_ratio * 0.1, 0.5)) * volume_factor
+                    
+                    # Create reason text including volume data
+                    volume_reason = ""
+                    if volume_signals and volume_signals.get('volume_signal'):
+                        volume_reason = f" Volume signal: {volume_signals['volume_signal']}"
+                    
+                    atm_opportunities.append({
+                        'type': 'CALL',
+                        'strike': opt['strike'],
+                        'buy_price': opt['call_ask'],
+                        'exit': opt['call_ask'] * 1.5,
+                        'stop_loss': opt['call_bid'] * 0.7,
+                        'oi_chng': opt['call_oi_chng'],
+                        'volume': opt['call_volume'],
+                        'iv': opt['call_iv'],
+                        'score': enhanced_score,
+                        'reason': f"ATM CALL with strong OI buildup and volume.{volume_reason}"
+                    })
+            
+            # Analyze PUT side with similar enhancements
+            if opt['put_oi_chng'] > 0 and opt['put_volume'] > 1000:
+                put_spread = opt['put_ask'] - opt['put_bid']
+                put_spread_pct = put_spread / opt['put_ltp'] if opt['put_ltp'] > 0 else float('inf')
+                
+                if put_spread_pct < 0.05:
+                    # Add market bias factor
+                    market_bias_factor = 1.2 if price_diff_pct > 0 else 0.9  # Favor ITM puts
+                    
+                    # Calculate volume to OI ratio
+                    vol_oi_ratio = opt['put_volume'] / opt['put_oi'] if opt['put_oi'] > 0 else 0
+                    
+                    # Add volume bias to score (negative volume bias boosts puts)
+                    volume_factor = 1 + (abs(volume_bias) / 20) if volume_bias < 0 else 1
+                    
+                    # Enhanced score calculation with volume factor
+                    enhanced_score = calculate_score(
+                        opt['put_oi_chng'], 
+                        opt['put_volume'], 
+                        put_spread_pct, 
+                        opt['put_iv']
+                    ) * market_bias_factor * (1 + min(vol_oi_ratio * 0.1, 0.5)) * volume_factor
+                    
+                    # Create reason text including volume data
+                    volume_reason = ""
+                    if volume_signals and volume_signals.get('volume_signal'):
+                        volume_reason = f" Volume signal: {volume_signals['volume_signal']}"
+                    
+                    atm_opportunities.append({
+                        'type': 'PUT',
+                        'strike': opt['strike'],
+                        'buy_price': opt['put_ask'],
+                        'exit': opt['put_ask'] * 1.5,
+                        'stop_loss': opt['put_bid'] * 0.7,
+                        'oi_chng': opt['put_oi_chng'],
+                        'volume': opt['put_volume'],
+                        'iv': opt['put_iv'],
+                        'score': enhanced_score,
+                        'reason': f"ATM PUT with strong OI buildup and volume.{volume_reason}"
+                    })
+        
+        # OTM Analysis with enhanced scoring
+        elif otm_range[0] < abs(price_diff_pct) <= otm_range[1]:
+            if price_diff_pct > 0:  # OTM CALL
+                if opt['call_oi_chng'] > 0 and opt['call_volume'] > 500:
+                    spread = opt['call_ask'] - opt['call_bid']
+                    spread_pct = spread / opt['call_ltp'] if opt['call_ltp'] > 0 else float('inf')
+                    
+                    if spread_pct < 0.08:
+                        # Calculate risk-reward ratio
+                        risk = opt['call_ask'] - opt['call_bid'] * 0.6
+                        reward = opt['call_ask'] * 2 - opt['call_ask']
+                        risk_reward = reward / risk if risk > 0 else 0
+                        
+                        # Add volume bias to score (positive volume bias boosts calls)
+                        volume_factor = 1 + (volume_bias / 20) if volume_bias > 0 else 1
+                        
+                        # Enhanced score with risk-reward factor and volume
+                        enhanced_score = calculate_score(
+                            opt['call_oi_chng'], 
+                            opt['call_volume'], 
+                            spread_pct, 
+                            opt['call_iv']
+                        ) * min(risk_reward * 0.2, 1.5) * volume_factor
+                        
+                        # Create reason text including volume data
+                        volume_reason = ""
+                        if volume_signals and volume_signals.get('volume_signal'):
+                            volume_reason = f" Volume signal: {volume_signals['volume_signal']}"
+                        
+                        otm_opportunities.append({
+                            'type': 'CALL',
+                            'strike': opt['strike'],
+                            'buy_price': opt['call_ask'],
+                            'exit': opt['call_ask'] * 2,
+                            'stop_loss': opt['call_bid'] * 0.6,
+                            'oi_chng': opt['call_oi_chng'],
+                            'volume': opt['call_volume'],
+                            'iv': opt['call_iv'],
+                            'score': enhanced_score,
+                            'reason': f"OTM CALL with potential momentum, Risk:Reward = 1:{risk_reward:.1f}.{volume_reason}"
+                        })
+            else:  # OTM PUT with enhanced scoring
+                if opt['put_oi_chng'] > 0 and opt['put_volume'] > 500:
+                    spread = opt['put_ask'] - opt['put_bid']
+                    spread_pct = spread / opt['put_ltp'] if opt['put_ltp'] > 0 else float('inf')
+                    
+                    if spread_pct < 0.08:
+                        # Calculate risk-reward ratio
+                        risk = opt['put_ask'] - opt['put_bid'] * 0.6
+                        reward = opt['put_ask'] * 2 - opt['put_ask']
+                        risk_reward = reward / risk if risk > 0 else 0
+                        
+                        # Add volume bias to score (negative volume bias boosts puts)
+                        volume_factor = 1 + (abs(volume_bias) / 20) if volume_bias < 0 else 1
+                        
+                        # Enhanced score with risk-reward factor and volume
+                        enhanced_score = calculate_score(
+                            opt['put_oi_chng'], 
+                            opt['put_volume'], 
+                            spread_pct, 
+                            opt['put_iv']
+                        ) * min(risk_reward * 0.2, 1.5) * volume_factor
+                        
+                        # Create reason text including volume data
+                        volume_reason = ""
+                        if volume_signals and volume_signals.get('volume_signal'):
+                            volume_reason = f" Volume signal: {volume_signals['volume_signal']}"
+                        
+                        otm_opportunities.append({
+                            'type': 'PUT',
+                            'strike': opt['strike'],
+                            'buy_price': opt['put_ask'],
+                            'exit': opt['put_ask'] * 2,
+                            'stop_loss': opt['put_bid'] * 0.6,
+                            'oi_chng': opt['put_oi_chng'],
+                            'volume': opt['put_volume'],
+                            'iv': opt['put_iv'],
+                            'score': enhanced_score,
+                            'reason': f"OTM PUT with potential momentum, Risk:Reward = 1:{risk_reward:.1f}.{volume_reason}"
+                        })
+    
+    # Sort opportunities by score
+    atm_opportunities.sort(key=lambda x: x['score'], reverse=True)
+    otm_opportunities.sort(key=lambda x: x['score'], reverse=True)
+    
+    # Get the absolute best trade
+    all_opportunities = atm_opportunities + otm_opportunities
+    all_opportunities.sort(key=lambda x: x['score'], reverse=True)
+    
+    return {
+        'best_overall': all_opportunities[:1],  # The single best trade
+        'best_atm': atm_opportunities[:2],      # Top 2 ATM opportunities
+        'best_otm': otm_opportunities[:2]       # Top 2 OTM opportunities
+    }
+
+def calculate_score(oi_change: float, volume: float, spread_pct: float, iv: float) -> float:
+    """Calculate a score for ranking trade opportunities."""
+    oi_score = min(oi_change / 1000, 10)  # Cap at 10
+    volume_score = min(volume / 5000, 10)  # Cap at 10
+    spread_score = max(10 - (spread_pct * 100), 0)  # Lower spread is better
+    iv_score = min(iv / 5, 10)  # Cap at 10
+    
+    # Weighted scoring
+    return (oi_score * 0.4 +        # 40% weight to OI change
+            volume_score * 0.3 +     # 30% weight to volume
+            spread_score * 0.2 +     # 20% weight to spread
+            iv_score * 0.1)         # 10% weight to IV
+
+def analyze_price_imbalances(options: List[Dict], current_price: float) -> List[Dict]:
+    """Analyze price imbalances in option chain to identify trading opportunities."""
+    imbalances = []
+    
+    for opt in options:
+        # Skip if no valid prices
+        if opt['call_ltp'] <= 0 or opt['put_ltp'] <= 0:
+            continue
+            
+        # Calculate price ratios and imbalances
+        strike_distance = abs(opt['strike'] - current_price)
+        strike_distance_pct = strike_distance / current_price
+        
+        # Skip strikes too far from current price (>7%)
+        if strike_distance_pct > 0.07:
+            continue
+            
+        call_put_ratio = opt['call_ltp'] / opt['put_ltp']
+        
+        # Check for significant volume
+        min_volume = 500
+        if opt['call_volume'] < min_volume or opt['put_volume'] < min_volume:
+            continue
+            
+        # Calculate bid-ask spreads
+        call_spread = opt['call_ask'] - opt['call_bid']
+        put_spread = opt['put_ask'] - opt['put_bid']
+        
+        # Skip if spreads are too wide (>5% of option price)
+        if (call_spread / opt['call_ltp'] > 0.05 or 
+            put_spread / opt['put_ltp'] > 0.05):
+            continue
+            
+        # Look for price imbalances
+        if call_put_ratio > 1.5:  # Calls relatively expensive
+            score = min((call_put_ratio - 1.5) * 10, 10)  # Score from 0-10
+            imbalances.append({
+                'type': 'PUT',
+                'strike': opt['strike'],
+                'buy_price': opt['put_ask'],
+                'exit': opt['put_ask'] * 1.5,
+                'stop_loss': opt['put_bid'] * 0.7,
+                'score': score,
+                'reason': f"Calls expensive relative to puts (ratio: {call_put_ratio:.2f})"
+            })
+        elif call_put_ratio < 0.67:  # Puts relatively expensive
+            score = min((0.67 / call_put_ratio - 1) * 10, 10)  # Score from 0-10
+            imbalances.append({
+                'type': 'CALL',
+                'strike': opt['strike'],
+                'buy_price': opt['call_ask'],
+                'exit': opt['call_ask'] * 1.5,
+                'stop_loss': opt['call_bid'] * 0.7,
+                'score': score,
+                'reason': f"Puts expensive relative to calls (ratio: {call_put_ratio:.2f})"
+            })
+    
+    # Sort by score
+    imbalances.sort(key=lambda x: x['score'], reverse=True)
+    return imbalances
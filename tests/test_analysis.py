@@ -0,0 +1,91 @@
+import unittest
+
+import numpy as np
+
+import trade
+from tests import reference
+from tests.chains import random_chain
+
+CHAIN_SIZES = (0, 1, 5, 300)
+SEEDS = range(100)
+
+class VectorizedAnalysisTest(unittest.TestCase):
+    """The array-based analyses must return exactly what the loops returned."""
+
+    def assert_matches_reference(self, name, make_args):
+        for seed in SEEDS:
+            for n in CHAIN_SIZES:
+                args = make_args(*random_chain(n, seed), seed)
+                with self.subTest(seed=seed, n=n):
+                    # repr also catches int/float differences in the output
+                    self.assertEqual(repr(getattr(trade, name)(*args)),
+                                     repr(getattr(reference, name)(*args)))
+
+    def test_find_max_put_oi_strike(self):
+        self.assert_matches_reference('find_max_put_oi_strike', lambda options, price, seed: (options,))
+
+    def test_analyze_calls(self):
+        self.assert_matches_reference('analyze_calls', lambda options, price, seed: (options, price))
+
+    def test_analyze_puts(self):
+        self.assert_matches_reference('analyze_puts', lambda options, price, seed: (options, price))
+
+    def test_analyze_otm_calls(self):
+        self.assert_matches_reference('analyze_otm_calls', lambda options, price, seed: (options, price))
+
+    def test_analyze_market_direction(self):
+        self.assert_matches_reference('analyze_market_direction', lambda options, price, seed: (options, price))
+
+    def test_analyze_best_trades(self):
+        def make_args(options, price, seed):
+            signals = {'volume_score': seed % 7 - 3, 'volume_signal': 'Bullish'}
+            return options, price, signals
+        self.assert_matches_reference('analyze_best_trades', make_args)
+
+    def test_analyze_best_trades_without_volume_signals(self):
+        self.assert_matches_reference('analyze_best_trades', lambda options, price, seed: (options, price))
+
+    def test_analyze_price_imbalances(self):
+        self.assert_matches_reference('analyze_price_imbalances', lambda options, price, seed: (options, price))
+
+    def test_analyze_option_chain(self):
+        for seed in range(20):
+            options, price = random_chain(300, seed)
+            signals = {'volume_score': 2, 'volume_signal': 'Bullish'}
+            analysis = trade.analyze_option_chain(options, price, signals, imbalance_limit=3)
+            with self.subTest(seed=seed):
+                self.assertEqual(repr(analysis['market_direction']),
+                                 repr(reference.analyze_market_direction(options, price)))
+                self.assertEqual(repr(analysis['best_trades']),
+                                 repr(reference.analyze_best_trades(options, price, signals)))
+                self.assertEqual(repr(analysis['imbalance_trades']),
+                                 repr(reference.analyze_price_imbalances(options, price)[:3]))
+
+    def test_calculate_scores_matches_calculate_score(self):
+        rng = np.random.default_rng(0)
+        oi_change, volume = rng.uniform(0, 20000, 500), rng.uniform(0, 100000, 500)
+        spread_pct, iv = rng.uniform(0, 0.2, 500), rng.uniform(0, 80, 500)
+        scores = trade.calculate_scores(oi_change, volume, spread_pct, iv)
+        for i in range(500):
+            self.assertAlmostEqual(scores[i], reference.calculate_score(
+                oi_change[i], volume[i], spread_pct[i], iv[i]), places=12)
+
+class TopKTest(unittest.TestCase):
+
+    def test_matches_full_sort_with_ties(self):
+        rng = np.random.default_rng(1)
+        for trial in range(200):
+            n = int(rng.integers(1, 60))
+            # Few distinct values, so ties around the k-th score are common
+            scores = rng.integers(0, 5, n).astype(float)
+            tiebreak = rng.integers(0, 3, n).astype(float)
+            k = int(rng.integers(1, n + 2))
+            expected = sorted(range(n), key=lambda i: (-scores[i], tiebreak[i], i))[:k]
+            with self.subTest(trial=trial):
+                self.assertEqual(trade._top_k(scores, k, tiebreak).tolist(), expected)
+
+    def test_empty(self):
+        self.assertEqual(trade._top_k(np.array([]), 2).tolist(), [])
+
+if __name__ == '__main__':
+    unittest.main()
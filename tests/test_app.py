@@ -0,0 +1,107 @@
+import io
+import unittest
+from unittest import mock
+
+import app
+from tests.chains import random_chain, to_nse_csv
+
+class IndexTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('app.get_fno_stocks', return_value=['RELIANCE', 'TCS'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(app._fno_cache, {'expires_at': float('-inf'), 'symbols': None})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = app.app.test_client()
+
+    def test_page_has_etag(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'RELIANCE', response.data)
+        self.assertIsNotNone(response.get_etag()[0])
+        self.assertEqual(response.cache_control.max_age, app.INDEX_MAX_AGE)
+
+    def test_matching_etag_is_not_modified(self):
+        etag, _ = self.client.get('/').get_etag()
+        response = self.client.get('/', headers={'If-None-Match': f'"{etag}"'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.get_etag()[0], etag)
+
+    def test_stale_etag_gets_the_page(self):
+        response = self.client.get('/', headers={'If-None-Match': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'RELIANCE', response.data)
+
+class FnoCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('app.get_fno_stocks', return_value=['RELIANCE', 'TCS'])
+        self.get_fno_stocks = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(app._fno_cache, {'expires_at': float('-inf'), 'symbols': None})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_first_load_fetches(self):
+        self.assertEqual(app.get_cached_symbols(), (*app.INDICES, 'RELIANCE', 'TCS'))
+        self.get_fno_stocks.assert_called_once_with()
+
+    def test_stale_list_served_during_refresh(self):
+        stale = (*app.INDICES, 'INFY')
+        app._fno_cache['symbols'] = stale
+        # Another thread is refreshing; this request must not wait for it
+        with app._fno_lock:
+            self.assertEqual(app.get_cached_symbols(), stale)
+        self.get_fno_stocks.assert_not_called()
+
+    def test_expired_list_refreshed(self):
+        app._fno_cache['symbols'] = (*app.INDICES, 'INFY')
+        self.assertEqual(app.get_cached_symbols(), (*app.INDICES, 'RELIANCE', 'TCS'))
+
+class AnalyzeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = app.app.test_client()
+
+    def upload(self, content, current_price='20000'):
+        return self.client.post('/analyze', data={
+            'file': (io.BytesIO(content), 'chain.csv'),
+            'currentPrice': current_price,
+        }, content_type='multipart/form-data')
+
+    def test_valid_chain(self):
+        options, price = random_chain(100, 0)
+        response = self.upload(to_nse_csv(options).encode(), str(price))
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['current_price'], price)
+        self.assertLessEqual(len(data['imbalance_trades']), 3)
+        self.assertNotIn('all_trades', data)
+
+    def test_narrow_csv_is_rejected(self):
+        response = self.upload(b'STRIKE,LTP\n100,2\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'No valid data found in the file')
+
+    def test_empty_csv_is_rejected(self):
+        response = self.upload(b'')
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_utf8_csv_is_rejected(self):
+        options, _ = random_chain(5, 0)
+        response = self.upload(to_nse_csv(options).encode('utf-16'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'The file must be a UTF-8 encoded CSV')
+
+    def test_missing_current_price(self):
+        options, _ = random_chain(5, 0)
+        for current_price in ('', 'abc', '0', '-5', 'nan', 'inf', '-inf'):
+            with self.subTest(current_price=current_price):
+                response = self.upload(to_nse_csv(options).encode(), current_price)
+                self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import io
+import os
+import tempfile
+import unittest
+
+import trade
+from tests import reference
+from tests.chains import random_chain, to_nse_csv
+
+class ReadOptionChainTest(unittest.TestCase):
+    """The pandas reader must parse NSE exports exactly like the csv loop did."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_csv(self, text, name='chain.csv'):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_matches_reference(self):
+        for seed in range(50):
+            for n in (1, 5, 300):
+                options, _ = random_chain(n, seed)
+                path = self.write_csv(to_nse_csv(options), f'chain-{seed}-{n}.csv')
+                with self.subTest(seed=seed, n=n):
+                    # Compared by value: '-' cells now read as 0.0 where the
+                    # csv loop returned int 0 for float columns
+                    self.assertEqual(trade.read_option_chain(path),
+                                     reference.read_option_chain(path))
+
+    def test_stream_matches_path(self):
+        options, _ = random_chain(50, 0)
+        text = to_nse_csv(options)
+        path = self.write_csv(text)
+        self.assertEqual(trade.read_option_chain(io.StringIO(text)), trade.read_option_chain(path))
+
+    def test_empty_and_narrow_files_have_no_rows(self):
+        for text in ('', 'STRIKE,LTP\n100,2\n', 'a\nb\n1,2,3\n'):
+            with self.subTest(text=text):
+                self.assertEqual(trade.read_option_chain(io.StringIO(text)), [])
+
+    def test_cached_rows_are_not_shared(self):
+        options, _ = random_chain(5, 0)
+        path = self.write_csv(to_nse_csv(options))
+        first = trade.read_option_chain(path)
+        first[0]['strike'] = -1
+        first.pop()
+        second = trade.read_option_chain(path)
+        self.assertEqual(len(second), 5)
+        self.assertNotEqual(second[0]['strike'], -1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from unittest import mock
+
+import trade
+
+FAILED_MARKET_NEWS = {
+    'success': False,
+    'error': 'source down',
+    'news': [],
+    'stock_mentions': {},
+    'sector_analysis': {}
+}
+
+class EnhancedOptionChainsTest(unittest.TestCase):
+
+    def setUp(self):
+        for name, result in (
+                ('fetch_option_chain', {'success': True, 'current_price': 100.0, 'data': []}),
+                ('fetch_volume_data', {'success': False}),
+                ('fetch_stock_news', {'success': False, 'news': []})):
+            patcher = mock.patch(f'trade.{name}', return_value=result)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_batch_fetches_market_news_once(self):
+        # A failed fetch is not cached, so only passing it on avoids rescraping
+        with mock.patch('trade.fetch_market_news', return_value=FAILED_MARKET_NEWS) as fetch_news:
+            chains = trade.get_enhanced_option_chains([f'SYM{i}' for i in range(20)])
+        self.assertEqual(fetch_news.call_count, 1)
+        self.assertEqual(len(chains), 20)
+        for chain in chains.values():
+            self.assertTrue(chain['success'])
+            self.assertIs(chain['market_news'], FAILED_MARKET_NEWS)
+
+    def test_prefetched_market_news_is_used(self):
+        mention = {'title': 'RELIANCE rallies', 'date': '2024-01-01', 'sentiment': 'Bullish',
+                   'sentiment_score': 1, 'impact_factors': [], 'source': 'Test'}
+        market_news = dict(FAILED_MARKET_NEWS, success=True, stock_mentions={'RELIANCE': [mention]})
+        with mock.patch('trade.fetch_market_news') as fetch_news:
+            chain = trade.get_enhanced_option_chain('RELIANCE', market_news)
+        fetch_news.assert_not_called()
+        self.assertEqual(chain['news_data']['market_mentions'], [mention])
+
+    def test_market_news_fetched_without_prefetch(self):
+        with mock.patch('trade.fetch_market_news', return_value=FAILED_MARKET_NEWS) as fetch_news:
+            chain = trade.get_enhanced_option_chain('RELIANCE')
+        fetch_news.assert_called_once_with()
+        self.assertIs(chain['market_news'], FAILED_MARKET_NEWS)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from unittest import mock
+
+from trade import ttl_cache
+
+class TtlCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('trade.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = []
+
+    def make_cached(self, **options):
+        @ttl_cache(ttl=10, **options)
+        def fetch(*args, **kwargs):
+            self.calls.append((args, kwargs))
+            return len(self.calls)
+        return fetch
+
+    def test_hit_within_ttl(self):
+        fetch = self.make_cached()
+        self.assertEqual(fetch('NIFTY'), 1)
+        self.now += 9
+        self.assertEqual(fetch('NIFTY'), 1)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_expires_after_ttl(self):
+        fetch = self.make_cached()
+        self.assertEqual(fetch('NIFTY'), 1)
+        self.now += 10
+        self.assertEqual(fetch('NIFTY'), 2)
+
+    def test_keys_include_kwargs(self):
+        fetch = self.make_cached()
+        self.assertEqual(fetch('NIFTY'), 1)
+        self.assertEqual(fetch('NIFTY', days=5), 2)
+        self.assertEqual(fetch('NIFTY', days=5), 2)
+        self.assertEqual(fetch('NIFTY', days=7), 3)
+        self.assertEqual(fetch('BANKNIFTY'), 4)
+
+    def test_exceptions_are_not_cached(self):
+        results = [RuntimeError('upstream down'), 'ok']
+
+        @ttl_cache(ttl=10)
+        def fetch(symbol):
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        with self.assertRaises(RuntimeError):
+            fetch('NIFTY')
+        self.assertEqual(fetch('NIFTY'), 'ok')
+        self.assertEqual(fetch('NIFTY'), 'ok')
+
+    def test_failed_keys_keep_no_lock(self):
+        @ttl_cache(ttl=10)
+        def fetch(symbol):
+            raise RuntimeError('unknown symbol')
+
+        for i in range(100):
+            with self.assertRaises(RuntimeError):
+                fetch(f'BAD{i}')
+        self.assertEqual(fetch.cache_info(), {'entries': 0, 'key_locks': 0})
+
+    def test_cache_if_rejects_result(self):
+        fetch = self.make_cached(cache_if=lambda value: value > 1)
+        self.assertEqual(fetch('NIFTY'), 1)
+        self.assertEqual(fetch('NIFTY'), 2)
+        self.assertEqual(fetch('NIFTY'), 2)
+
+    def test_rejected_keys_keep_no_lock(self):
+        fetch = self.make_cached(cache_if=lambda value: False)
+        for i in range(100):
+            fetch(f'BAD{i}')
+        self.assertEqual(fetch.cache_info(), {'entries': 0, 'key_locks': 0})
+
+    def test_cached_keys_keep_their_lock(self):
+        fetch = self.make_cached()
+        fetch('NIFTY')
+        self.assertEqual(fetch.cache_info(), {'entries': 1, 'key_locks': 1})
+
+    def test_maxsize_evicts_oldest(self):
+        fetch = self.make_cached(maxsize=2)
+        fetch('A'), fetch('B'), fetch('C')
+        self.assertEqual(fetch('C'), 3)
+        self.assertEqual(fetch('A'), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,189 +1,423 @@
-import csv
-from typing import List, Dict, Optional
+from typing import IO, List, Dict, Mapping, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+import orjson
+import os
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
+from functools import lru_cache, wraps
+from itertools import chain, repeat
+from operator import itemgetter
+from types import MappingProxyType
+from lxml import etree, html as lxml_html
 import re
 
-def parse_number(value: str, num_type=float):
-    """Convert CSV string (with commas or '-') to int/float."""
-    if value.strip() in ('-', ''):
-        return 0
-    try:
-        cleaned = value.replace(',', '')
-        return num_type(cleaned)
-    except:
-        return 0
+NSE_BASE_URL = "https://www.nseindia.com"
+NSE_TIMEOUT = 10  # seconds
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Pooled NSE connections; also the most upstream fetches worth running at once
+NSE_POOL_MAXSIZE = 32
+
+# Shared session so NSE cookies and pooled connections are reused across
+# requests instead of paying a warmup round-trip on every call
+NSE_SESSION = requests.Session()
+NSE_SESSION.headers.update(HEADERS)
+# Keep enough pooled sockets for the concurrent fetch workers and retry
+# dropped connections briefly before surfacing the error
+NSE_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=NSE_POOL_MAXSIZE,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+))
+
+# Session for the non-NSE news sites, kept apart so their cookies never
+# mix with the NSE ones
+WEB_SESSION = requests.Session()
+WEB_SESSION.headers.update(HEADERS)
+WEB_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+))
+
+# Re-prime NSE cookies this often even without a 401/403
+NSE_COOKIE_TTL = 300  # seconds
+_cookie_lock = threading.Lock()
+_cookie_state = {'refreshed_at': float('-inf')}
+
+def _refresh_cookies(seen_at: float):
+    """Load fresh NSE cookies into the shared session.
+
+    ``seen_at`` is the refresh time the caller observed; if another thread
+    refreshed since then, its cookies are reused instead of hitting NSE again.
+    """
+    with _cookie_lock:
+        if _cookie_state['refreshed_at'] != seen_at:
+            return
+        NSE_SESSION.get(NSE_BASE_URL, timeout=NSE_TIMEOUT)
+        _cookie_state['refreshed_at'] = time.monotonic()
+
+def nse_get(url: str, params: Optional[Dict[str, str]] = None) -> requests.Response:
+    """GET an NSE API url on the shared session, refreshing cookies only when needed.
+    
+    Query values go in params so they are URL-encoded (e.g. the '&' in M&M).
+    """
+    seen_at = _cookie_state['refreshed_at']
+    if time.monotonic() - seen_at > NSE_COOKIE_TTL:
+        _refresh_cookies(seen_at)
+        seen_at = _cookie_state['refreshed_at']
+    
+    response = NSE_SESSION.get(url, params=params, timeout=NSE_TIMEOUT)
+    if response.status_code in (401, 403):
+        # Cookies expired, fetch new ones and retry once
+        _refresh_cookies(seen_at)
+        response = NSE_SESSION.get(url, params=params, timeout=NSE_TIMEOUT)
+    return response
 
-def read_option_chain(file_path: str) -> List[Dict]:
-    """Reads the option chain CSV and returns structured data."""
-    options = []
-    with open(file_path, 'r') as f:
-        reader = csv.reader(f)
-        next(reader)  # Skip header row
-        next(reader)  # Skip subheader row
+# Shared worker threads for upstream fetches, so a request doesn't pay for
+# spinning up and joining a fresh executor. Tasks running here must not
+# submit to and wait on this pool themselves, or they can starve it.
+# Each enhanced chain request fans out into 4 fetches, so size the pool from
+# the gunicorn thread count, capped at the NSE connection pool size.
+IO_POOL_WORKERS = min(int(os.environ.get('GUNICORN_THREADS', 16)) * 4, NSE_POOL_MAXSIZE)
+_IO_POOL = ThreadPoolExecutor(max_workers=IO_POOL_WORKERS, thread_name_prefix='nse-io')
+
+def ttl_cache(ttl: float, maxsize: int = 256, cache_if=None):
+    """Memoize a function's results per argument tuple for ttl seconds.
+    
+    Concurrent callers asking for the same missing key wait for a single
+    computation instead of all hitting the upstream service. Exceptions
+    are not cached, and neither are results rejected by cache_if.
+    """
+    def decorator(func):
+        cache = OrderedDict()  # key -> (expires_at, value)
+        kwargs_mark = object()  # separates positional from keyword args in keys
+        key_locks = {}
+        lock = threading.Lock()
         
-        for row in reader:
-            if len(row) < 21:  # Basic validation
-                continue
-                
-            # CALLS (left side)
-            call_oi = parse_number(row[1], int)
-            call_oi_chng = parse_number(row[2], int)
-            call_volume = parse_number(row[3], int)
-            call_iv = parse_number(row[4])
-            call_ltp = parse_number(row[5])
-            call_chng = parse_number(row[6])
-            call_bid = parse_number(row[8])
-            call_ask = parse_number(row[9])
-            
-            # Strike Price (middle)
-            strike = parse_number(row[11])
-            
-            # PUTS (right side)
-            put_bid = parse_number(row[13])
-            put_ask = parse_number(row[14])
-            put_chng = parse_number(row[16])
-            put_ltp = parse_number(row[17])
-            put_iv = parse_number(row[18])
-            put_volume = parse_number(row[19])
-            put_oi_chng = parse_number(row[20], int)
-            put_oi = parse_number(row[21], int)
+        def lookup(key):
+            entry = cache.get(key)
+            if entry and entry[0] > time.monotonic():
+                return True, entry[1]
+            return False, None
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = args + (kwargs_mark,) + tuple(sorted(kwargs.items())) if kwargs else args
+            with lock:
+                hit, value = lookup(key)
+                if hit:
+                    return value
+                key_lock = key_locks.setdefault(key, threading.Lock())
             
-            options.append({
-                'strike': strike,
-                'call_oi': call_oi,
-                'call_oi_chng': call_oi_chng,
-                'call_volume': call_volume,
-                'call_iv': call_iv,
-                'call_ltp': call_ltp,
-                'call_chng': call_chng,
-                'call_bid': call_bid,
-                'call_ask': call_ask,
-                'put_oi': put_oi,
-                'put_oi_chng': put_oi_chng,
-                'put_volume': put_volume,
-                'put_iv': put_iv,
-                'put_ltp': put_ltp,
-                'put_chng': put_chng,
-                'put_bid': put_bid,
-                'put_ask': put_ask,
-            })
-    return options
+            with key_lock:
+                # Another thread may have filled the entry while we waited
+                with lock:
+                    hit, value = lookup(key)
+                if hit:
+                    return value
+                
+                try:
+                    value = func(*args, **kwargs)
+                    if cache_if is not None and not cache_if(value):
+                        return value
+                    with lock:
+                        cache[key] = (time.monotonic() + ttl, value)
+                        cache.move_to_end(key)
+                        while len(cache) > maxsize:
+                            evicted, _ = cache.popitem(last=False)
+                            key_locks.pop(evicted, None)
+                finally:
+                    # Failed or rejected keys keep no lock, or arbitrary bad
+                    # symbols would grow key_locks without bound
+                    with lock:
+                        if key not in cache:
+                            key_locks.pop(key, None)
+            return value
+        
+        def cache_clear():
+            with lock:
+                cache.clear()
+                key_locks.clear()
+        
+        def cache_info():
+            with lock:
+                return {'entries': len(cache), 'key_locks': len(key_locks)}
+        
+        wrapper.cache_clear = cache_clear
+        wrapper.cache_info = cache_info
+        return wrapper
+    return decorator
+
+# Index symbols, which use the index variants of the NSE endpoints
+INDEX_SYMBOLS = frozenset(("NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY"))
+
+# Sector of each F&O stock, used to roll news sentiment up by sector
+STOCK_TO_SECTOR: Mapping[str, str] = MappingProxyType({
+    'HDFCBANK': 'Banking', 'ICICIBANK': 'Banking', 'KOTAKBANK': 'Banking',
+    'AXISBANK': 'Banking', 'SBIN': 'Banking', 'INDUSINDBK': 'Banking',
+    'BANKBARODA': 'Banking', 'PNB': 'Banking', 'FEDERALBNK': 'Banking',
+    'HDFC': 'Financial Services', 'BAJFINANCE': 'Financial Services',
+    'BAJAJFINSV': 'Financial Services', 'SHRIRAMFIN': 'Financial Services',
+    'CHOLAFIN': 'Financial Services', 'HDFCLIFE': 'Financial Services',
+    'SBILIFE': 'Financial Services',
+    'TCS': 'IT', 'INFY': 'IT', 'HCLTECH': 'IT', 'WIPRO': 'IT', 'TECHM': 'IT',
+    'LTIM': 'IT', 'PERSISTENT': 'IT', 'COFORGE': 'IT', 'MPHASIS': 'IT',
+    'RELIANCE': 'Energy', 'ONGC': 'Energy', 'BPCL': 'Energy', 'IOC': 'Energy',
+    'GAIL': 'Energy', 'COALINDIA': 'Energy', 'NTPC': 'Power',
+    'POWERGRID': 'Power', 'TATAPOWER': 'Power', 'ADANIPOWER': 'Power',
+    'MARUTI': 'Automobile', 'TATAMOTORS': 'Automobile', 'M&M': 'Automobile',
+    'EICHERMOT': 'Automobile', 'BAJAJ-AUTO': 'Automobile',
+    'HEROMOTOCO': 'Automobile', 'TVSMOTOR': 'Automobile',
+    'SUNPHARMA': 'Pharma', 'CIPLA': 'Pharma', 'DRREDDY': 'Pharma',
+    'DIVISLAB': 'Pharma', 'LUPIN': 'Pharma', 'APOLLOHOSP': 'Healthcare',
+    'HINDUNILVR': 'FMCG', 'ITC': 'FMCG', 'NESTLEIND': 'FMCG',
+    'BRITANNIA': 'FMCG', 'DABUR': 'FMCG', 'TATACONSUM': 'FMCG',
+    'TATASTEEL': 'Metals', 'JSWSTEEL': 'Metals', 'HINDALCO': 'Metals',
+    'VEDL': 'Metals', 'SAIL': 'Metals', 'NMDC': 'Metals',
+    'ULTRACEMCO': 'Cement', 'GRASIM': 'Cement', 'SHREECEM': 'Cement',
+    'AMBUJACEM': 'Cement', 'ASIANPAINT': 'Consumer Durables',
+    'TITAN': 'Consumer Durables', 'BHARTIARTL': 'Telecom',
+    'LT': 'Infrastructure', 'ADANIPORTS': 'Infrastructure',
+    'ADANIENT': 'Conglomerate', 'UPL': 'Chemicals', 'PIDILITIND': 'Chemicals'
+})
 
-def find_max_put_oi_strike(options: List[Dict]) -> float:
+# Column of each field in the NSE option chain CSV export
+CSV_COLUMNS = {
+    'strike': 11,
+    'call_oi': 1, 'call_oi_chng': 2, 'call_volume': 3, 'call_iv': 4,
+    'call_ltp': 5, 'call_chng': 6, 'call_bid': 8, 'call_ask': 9,
+    'put_oi': 21, 'put_oi_chng': 20, 'put_volume': 19, 'put_iv': 18,
+    'put_ltp': 17, 'put_chng': 16, 'put_bid': 13, 'put_ask': 14,
+}
+
+# Fields kept as whole numbers, the rest are read as floats
+CSV_INT_FIELDS = ('call_oi', 'call_oi_chng', 'call_volume', 'put_oi_chng', 'put_oi')
+
+def read_option_chain(source: Union[str, IO[str]]) -> List[Dict]:
+    """Reads the option chain CSV from a path or text stream and returns structured data."""
+    if isinstance(source, str):
+        # Re-reading an unchanged export reuses the parsed values; the cache
+        # holds immutable tuples, so every caller gets its own row dicts
+        stat = os.stat(source)
+        rows = _read_option_chain_file(source, stat.st_mtime_ns, stat.st_size)
+    else:
+        rows = _parse_option_rows(source)
+    return [dict(zip(OPTION_FIELDS, row)) for row in rows]
+
+@lru_cache(maxsize=4)
+def _read_option_chain_file(path: str, mtime_ns: int, size: int) -> Tuple[tuple, ...]:
+    """Parse a CSV file once per modification time and size."""
+    return tuple(_parse_option_rows(path))
+
+def _parse_option_rows(source: Union[str, IO[str]]) -> List[tuple]:
+    """Parse option chain rows from a CSV path or open text stream as OPTION_FIELDS tuples."""
+    try:
+        df = pd.read_csv(
+            source,
+            skiprows=2,  # Skip header and subheader rows
+            header=None,
+            # Name the columns up to the last one used, so rows that are
+            # narrower or wider than the first still line up by position
+            names=range(max(CSV_COLUMNS.values()) + 1),
+            index_col=False,
+            usecols=list(CSV_COLUMNS.values()),
+            thousands=',',
+            na_values=['-'],
+            skipinitialspace=True
+        )
+    except UnicodeDecodeError:
+        raise
+    except ValueError:
+        # Empty files and files too narrow to hold the option chain columns
+        # have no option rows to offer
+        return []
+    
+    # Cells that aren't numbers ('-', blanks, stray text) count as 0, and
+    # rows without a strike are not option rows at all
+    columns = {}
+    for field, col in CSV_COLUMNS.items():
+        values = df[col]
+        if not pd.api.types.is_numeric_dtype(values):
+            # A stray non-numeric cell leaves the column as text, separators and all
+            values = pd.to_numeric(values.str.replace(',', '', regex=False), errors='coerce')
+        columns[field] = values.to_numpy(dtype=np.float64)
+    has_strike = ~np.isnan(columns['strike'])
+    
+    # Build the rows from plain Python lists, which is much cheaper than
+    # DataFrame.to_dict for chains of a few hundred strikes
+    field_values = []
+    for field in OPTION_FIELDS:
+        values = np.nan_to_num(columns[field][has_strike])
+        if field in CSV_INT_FIELDS:
+            values = values.astype(np.int64)
+        field_values.append(values.tolist())
+    return list(zip(*field_values))
+
+OPTION_FIELDS = (
+    'strike', 'call_oi', 'call_oi_chng', 'call_volume', 'call_iv', 'call_ltp',
+    'call_chng', 'call_bid', 'call_ask', 'put_oi', 'put_oi_chng', 'put_volume',
+    'put_iv', 'put_ltp', 'put_chng', 'put_bid', 'put_ask'
+)
+
+_get_option_fields = itemgetter(*OPTION_FIELDS)
+
+def options_to_soa(options: List[Dict]) -> Dict[str, np.ndarray]:
+    """Convert option chain rows into one float array per field."""
+    # One C-level tuple build per row, then transpose into contiguous columns
+    table = np.array([_get_option_fields(opt) for opt in options], dtype=np.float64)
+    columns = np.ascontiguousarray(table.reshape(len(options), len(OPTION_FIELDS)).T)
+    return dict(zip(OPTION_FIELDS, columns))
+
+def _as_soa(options: Union[List[Dict], Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Return SoA arrays for the chain, converting list rows if needed."""
+    return options if isinstance(options, dict) else options_to_soa(options)
+
+def find_max_put_oi_strike(options: Union[List[Dict], Dict[str, np.ndarray]]) -> float:
     """Identify the strike with the highest PUT OI."""
-    max_oi = -1
-    key_strike = 0
-    for opt in options:
-        if opt['put_oi'] > max_oi:
-            max_oi = opt['put_oi']
-            key_strike = opt['strike']
-    return key_strike
+    soa = _as_soa(options)
+    if not soa['put_oi'].size:
+        return 0
+    # argmax keeps the first strike on ties, like the original scan
+    return float(soa['strike'][soa['put_oi'].argmax()])
 
-def analyze_calls(options: List[Dict], current_price: float) -> List[Dict]:
-    """Filter CALL options with high OI change, volume and tight spreads."""
-    candidates = []
-    for opt in options:
-        # Only consider strikes near the current price (within ±5%)
-        if abs(opt['strike'] - current_price) / current_price <= 0.05:
-            if (opt['call_oi_chng'] > 0 and 
-                opt['call_volume'] > 1000 and 
-                opt['call_ltp'] > 0):
-                
-                spread = opt['call_ask'] - opt['call_bid']
-                spread_percentage = spread / opt['call_ltp'] * 100
-                
-                if spread_percentage < 5:
-                    candidates.append({
-                        'strike': opt['strike'],
-                        'buy_price': opt['call_ask'],
-                        'exit': opt['call_ask'] * 1.5,
-                        'stop_loss': opt['call_bid'] * 0.7,
-                        'oi_chng': opt['call_oi_chng'],
-                        'volume': opt['call_volume'],
-                        'iv': opt['call_iv'],
-                        'reason': f"OI Change: {opt['call_oi_chng']}, Volume: {opt['call_volume']}"
-                    })
+def _near_side_candidates(options: List[Dict], soa: Dict[str, np.ndarray], near: np.ndarray,
+                          side: str) -> List[Dict]:
+    """Select one side's liquid strikes from the near mask, ranked by OI change then volume."""
+    ltp = soa[f'{side}_ltp']
+    oi_chng = soa[f'{side}_oi_chng']
+    volume = soa[f'{side}_volume']
     
-    candidates.sort(key=lambda x: (x['oi_chng'], x['volume']), reverse=True)
+    traded = ltp > 0
+    spread_pct = np.divide(soa[f'{side}_ask'] - soa[f'{side}_bid'], ltp,
+                           out=np.full_like(ltp, np.inf), where=traded) * 100
+    mask = near & (oi_chng > 0) & (volume > 1000) & traded & (spread_pct < 5)
+    
+    # Stable descending order on (OI change, volume), matching a reversed sort
+    selected = np.nonzero(mask)[0]
+    selected = selected[np.lexsort((-volume[selected], -oi_chng[selected]))]
+    
+    get_fields = itemgetter('strike', f'{side}_ask', f'{side}_bid', f'{side}_oi_chng',
+                            f'{side}_volume', f'{side}_iv')
+    candidates = []
+    for i in selected:
+        strike, ask, bid, row_oi_chng, row_volume, iv = get_fields(options[i])
+        candidates.append({
+            'strike': strike,
+            'buy_price': ask,
+            'exit': ask * 1.5,
+            'stop_loss': bid * 0.7,
+            'oi_chng': row_oi_chng,
+            'volume': row_volume,
+            'iv': iv,
+            'reason': f"OI Change: {row_oi_chng}, Volume: {row_volume}"
+        })
     return candidates
 
+def _price_diff_pct(soa: Dict[str, np.ndarray], current_price: float) -> np.ndarray:
+    """Signed distance of each strike from the current price, as a fraction of it."""
+    return (soa['strike'] - current_price) / current_price
+
+def _near_mask(price_diff_pct: np.ndarray) -> np.ndarray:
+    """Mask of strikes within ±5% of the current price."""
+    return np.abs(price_diff_pct) <= 0.05
+
+def analyze_calls(options: List[Dict], current_price: float) -> List[Dict]:
+    """Filter CALL options with high OI change, volume and tight spreads."""
+    soa = options_to_soa(options)
+    near = _near_mask(_price_diff_pct(soa, current_price))
+    return _near_side_candidates(options, soa, near, 'call')
+
 def analyze_puts(options: List[Dict], current_price: float) -> List[Dict]:
     """Filter PUT options with high OI change and volume."""
-    candidates = []
-    for opt in options:
-        # Only consider strikes near the current price (within ±5%)
-        if abs(opt['strike'] - current_price) / current_price <= 0.05:
-            if (opt['put_oi_chng'] > 0 and 
-                opt['put_volume'] > 1000 and
-                opt['put_ltp'] > 0):
-                
-                spread = opt['put_ask'] - opt['put_bid']
-                spread_percentage = spread / opt['put_ltp'] * 100
-                
-                if spread_percentage < 5:
-                    candidates.append({
-                        'strike': opt['strike'],
-                        'buy_price': opt['put_ask'],
-                        'exit': opt['put_ask'] * 1.5,
-                        'stop_loss': opt['put_bid'] * 0.7,
-                        'oi_chng': opt['put_oi_chng'],
-                        'volume': opt['put_volume'],
-                        'iv': opt['put_iv'],
-                        'reason': f"OI Change: {opt['put_oi_chng']}, Volume: {opt['put_volume']}"
-                    })
+    soa = options_to_soa(options)
+    near = _near_mask(_price_diff_pct(soa, current_price))
+    return _near_side_candidates(options, soa, near, 'put')
+
+def _otm_call_candidates(options: List[Dict], soa: Dict[str, np.ndarray],
+                         current_price: float) -> List[Dict]:
+    """Select OTM CALLs 2-10% above the price with OI buildup, largest first."""
+    strike = soa['strike']
+    oi_chng = soa['call_oi_chng']
     
-    candidates.sort(key=lambda x: (x['oi_chng'], x['volume']), reverse=True)
+    # Consider strikes 2-10% above current price for OTM calls
+    mask = (1.02 * current_price <= strike) & (strike <= 1.10 * current_price)
+    mask &= (oi_chng > 0) & (soa['call_ask'] - soa['call_bid'] < 2.0)
+    
+    selected = np.nonzero(mask)[0]
+    selected = selected[np.argsort(-oi_chng[selected], kind='stable')]
+    
+    get_fields = itemgetter('strike', 'call_ask', 'call_bid', 'call_oi_chng', 'call_volume', 'call_iv')
+    candidates = []
+    for i in selected:
+        row_strike, ask, bid, row_oi_chng, volume, iv = get_fields(options[i])
+        candidates.append({
+            'strike': row_strike,
+            'buy_price': ask,
+            'exit': ask * 2,
+            'stop_loss': bid * 0.7,
+            'oi_chng': row_oi_chng,
+            'volume': volume,
+            'iv': iv,
+            'reason': f"OTM with OI buildup, Volume: {volume}"
+        })
     return candidates
 
 def analyze_otm_calls(options: List[Dict], current_price: float) -> List[Dict]:
     """Identify OTM CALLs based on current price."""
-    candidates = []
-    for opt in options:
-        # Consider strikes 2-10% above current price for OTM calls
-        if 1.02 * current_price <= opt['strike'] <= 1.10 * current_price:
-            if opt['call_oi_chng'] > 0:
-                spread = opt['call_ask'] - opt['call_bid']
-                if spread < 2.0:
-                    candidates.append({
-                        'strike': opt['strike'],
-                        'buy_price': opt['call_ask'],
-                        'exit': opt['call_ask'] * 2,
-                        'stop_loss': opt['call_bid'] * 0.7,
-                        'oi_chng': opt['call_oi_chng'],
-                        'volume': opt['call_volume'],
-                        'iv': opt['call_iv'],
-                        'reason': f"OTM with OI buildup, Volume: {opt['call_volume']}"
-                    })
-    candidates.sort(key=lambda x: x['oi_chng'], reverse=True)
-    return candidates
+    return _otm_call_candidates(options, options_to_soa(options), current_price)
 
-def analyze_market_direction(options: List[Dict], current_price: float) -> Dict:
+def analyze_levels(options: List[Dict], current_price: float) -> Dict:
+    """Run the key strike, CALL, PUT and OTM CALL scans over one shared array view."""
+    # Convert to arrays and compute the ±5% mask once for all four scans
+    soa = options_to_soa(options)
+    near = _near_mask(_price_diff_pct(soa, current_price))
+    return {
+        'key_strike': find_max_put_oi_strike(soa),
+        'calls': _near_side_candidates(options, soa, near, 'call'),
+        'puts': _near_side_candidates(options, soa, near, 'put'),
+        'otm_calls': _otm_call_candidates(options, soa, current_price)
+    }
+
+def analyze_market_direction(options: Union[List[Dict], Dict[str, np.ndarray]],
+                             current_price: float) -> Dict:
     """Analyze market direction based on option chain data."""
-    call_oi_sum = 0
-    put_oi_sum = 0
-    call_volume_sum = 0
-    put_volume_sum = 0
+    soa = _as_soa(options)
+    return _market_direction(soa, _near_mask(_price_diff_pct(soa, current_price)), current_price)
+
+def _market_direction(soa: Dict[str, np.ndarray], near: np.ndarray, current_price: float) -> Dict:
+    """Derive bias, PCR and target from the strikes within ±5% of the price."""
+    strikes = soa['strike'][near]
+    call_oi = soa['call_oi'][near]
+    put_oi = soa['put_oi'][near]
+    
+    call_oi_sum = call_oi.sum()
+    put_oi_sum = put_oi.sum()
+    call_volume_sum = soa['call_volume'][near].sum()
+    put_volume_sum = soa['put_volume'][near].sum()
+    
+    # Strikes holding the most open interest (first one wins on ties)
     max_call_oi = {'strike': 0, 'oi': 0}
     max_put_oi = {'strike': 0, 'oi': 0}
-    
-    for opt in options:
-        # Consider only strikes within ±5% of current price
-        if abs(opt['strike'] - current_price) / current_price <= 0.05:
-            call_oi_sum += opt['call_oi']
-            put_oi_sum += opt['put_oi']
-            call_volume_sum += opt['call_volume']
-            put_volume_sum += opt['put_volume']
-            
-            if opt['call_oi'] > max_call_oi['oi']:
-                max_call_oi = {'strike': opt['strike'], 'oi': opt['call_oi']}
-            if opt['put_oi'] > max_put_oi['oi']:
-                max_put_oi = {'strike': opt['strike'], 'oi': opt['put_oi']}
+    if call_oi.size and call_oi.max() > 0:
+        i = call_oi.argmax()
+        max_call_oi = {'strike': float(strikes[i]), 'oi': float(call_oi[i])}
+    if put_oi.size and put_oi.max() > 0:
+        i = put_oi.argmax()
+        max_put_oi = {'strike': float(strikes[i]), 'oi': float(put_oi[i])}
 
-    pcr = put_oi_sum / call_oi_sum if call_oi_sum > 0 else 0
-    volume_ratio = put_volume_sum / call_volume_sum if call_volume_sum > 0 else 0
+    pcr = float(put_oi_sum / call_oi_sum) if call_oi_sum > 0 else 0
+    volume_ratio = float(put_volume_sum / call_volume_sum) if call_volume_sum > 0 else 0
     
     # Determine market bias
     bias = "Neutral"
@@ -253,8 +487,74 @@ def print_results(key_strike: float, calls: List[Dict], puts: List[Dict], otm_ca
     safe_print(puts, "\nPUT Trading Opportunities")
     safe_print(otm_calls, "\nOTM CALL Opportunities")
 
+def _atm_side_scores(soa: Dict[str, np.ndarray], atm: np.ndarray, price_diff_pct: np.ndarray,
+                     side: str, volume_factor: float):
+    """Score one side's ATM strikes, returning the qualifying rows and their scores."""
+    oi_chng = soa[f'{side}_oi_chng']
+    volume = soa[f'{side}_volume']
+    ltp = soa[f'{side}_ltp']
+    
+    rows = np.nonzero(atm & (oi_chng > 0) & (volume > 1000))[0]
+    ltp = ltp[rows]
+    spread_pct = np.divide(soa[f'{side}_ask'][rows] - soa[f'{side}_bid'][rows], ltp,
+                           out=np.full_like(ltp, np.inf), where=ltp > 0)
+    keep = spread_pct < 0.05  # 5% spread threshold
+    rows, spread_pct = rows[keep], spread_pct[keep]
+    
+    # Favor ITM strikes: below the price for calls, above it for puts
+    itm = price_diff_pct[rows] < 0 if side == 'call' else price_diff_pct[rows] > 0
+    market_bias_factor = np.where(itm, 1.2, 0.9)
+    
+    # Volume to OI ratio (higher is better)
+    oi = soa[f'{side}_oi'][rows]
+    volume = volume[rows]
+    vol_oi_ratio = np.divide(volume, oi, out=np.zeros_like(oi), where=oi > 0)
+    
+    scores = calculate_scores(oi_chng[rows], volume, spread_pct, soa[f'{side}_iv'][rows])
+    scores = scores * market_bias_factor * (1 + np.minimum(vol_oi_ratio * 0.1, 0.5)) * volume_factor
+    return rows, scores
+
+def _otm_side_scores(soa: Dict[str, np.ndarray], otm: np.ndarray, side: str, volume_factor: float):
+    """Score one side's OTM strikes, returning the qualifying rows, scores and risk-reward."""
+    oi_chng = soa[f'{side}_oi_chng']
+    volume = soa[f'{side}_volume']
+    
+    rows = np.nonzero(otm & (oi_chng > 0) & (volume > 500))[0]
+    ltp = soa[f'{side}_ltp'][rows]
+    ask = soa[f'{side}_ask'][rows]
+    bid = soa[f'{side}_bid'][rows]
+    spread_pct = np.divide(ask - bid, ltp, out=np.full_like(ltp, np.inf), where=ltp > 0)
+    keep = spread_pct < 0.08
+    rows, spread_pct, ask, bid = rows[keep], spread_pct[keep], ask[keep], bid[keep]
+    
+    # Risk down to a 0.6x bid stop against the reward of a 2x exit
+    risk = ask - bid * 0.6
+    reward = ask * 2 - ask
+    risk_reward = np.divide(reward, risk, out=np.zeros_like(risk), where=risk > 0)
+    
+    scores = calculate_scores(oi_chng[rows], volume[rows], spread_pct, soa[f'{side}_iv'][rows])
+    scores = scores * np.minimum(risk_reward * 0.2, 1.5) * volume_factor
+    return rows, scores, risk_reward
+
+def _top_k(scores: np.ndarray, k: int, *tiebreaks: np.ndarray) -> np.ndarray:
+    """Indices of the k highest scores, best first, breaking ties by the given keys in order."""
+    candidates = np.arange(scores.size)
+    if scores.size > k:
+        # Partition to find the k-th best score in O(n), keeping every tie with it
+        kth_best = np.partition(scores, scores.size - k)[scores.size - k]
+        candidates = candidates[scores >= kth_best]
+    keys = [key[candidates] for key in reversed(tiebreaks)]
+    order = np.lexsort((*keys, -scores[candidates]))
+    return candidates[order[:k]]
+
 def analyze_best_trades(options: List[Dict], current_price: float, volume_signals: Dict = None) -> Dict:
     """Analyze and select the best trading opportunities with volume data."""
+    soa = options_to_soa(options)
+    return _best_trades(options, soa, _price_diff_pct(soa, current_price), volume_signals)
+
+def _best_trades(options: List[Dict], soa: Dict[str, np.ndarray], price_diff_pct: np.ndarray,
+                 volume_signals: Dict = None) -> Dict:
+    """Select the best ATM and OTM trades from the chain rows and their array view."""
     atm_range = 0.02  # 2% range for ATM
     otm_range = (0.02, 0.10)  # 2-10% range for OTM
     
@@ -267,194 +567,88 @@ def analyze_best_trades(options: List[Dict], current_price: float, volume_signal
     if volume_signals:
         volume_bias = volume_signals.get('volume_score', 0)
     
-    for opt in options:
-        price_diff_pct = (opt['strike'] - current_price) / current_price
-        
-        # ATM Analysis (within ±2% of current price)
-        if abs(price_diff_pct) <= atm_range:
-            # Analyze CALL side
-            if opt['call_oi_chng'] > 0 and opt['call_volume'] > 1000:
-                call_spread = opt['call_ask'] - opt['call_bid']
-                call_spread_pct = call_spread / opt['call_ltp'] if opt['call_ltp'] > 0 else float('inf')
-                
-                if call_spread_pct < 0.05:  # 5% spread threshold
-                    # Add market bias factor to score
-                    market_bias_factor = 1.2 if price_diff_pct < 0 else 0.9  # Favor ITM calls
-                    
-                    # Calculate volume to OI ratio (higher is better)
-                    vol_oi_ratio = opt['call_volume'] / opt['call_oi'] if opt['call_oi'] > 0 else 0
-                    
-                    # Add volume bias to score (positive volume bias boosts calls)
-                    volume_factor = 1 + (volume_bias / 20) if volume_bias > 0 else 1
-                    
-                    # Enhanced score calculation with volume factor
-                    enhanced_score = calculate_score(
-                        opt['call_oi_chng'], 
-                        opt['call_volume'], 
-                        call_spread_pct, 
-                        opt['call_iv']
-                    ) * market_bias_factor * (1 + min(vol_oi_ratio * 0.1, 0.5)) * volume_factor
-                    
-                    # Create reason text including volume data
-                    volume_reason = ""
-                    if volume_signals and volume_signals.get('volume_signal'):
-                        volume_reason = f" Volume signal: {volume_signals['volume_signal']}"
-                    
-                    atm_opportunities.append({
-                        'type': 'CALL',
-                        'strike': opt['strike'],
-                        'buy_price': opt['call_ask'],
-                        'exit': opt['call_ask'] * 1.5,
-                        'stop_loss': opt['call_bid'] * 0.7,
-                        'oi_chng': opt['call_oi_chng'],
-                        'volume': opt['call_volume'],
-                        'iv': opt['call_iv'],
-                        'score': enhanced_score,
-                        'reason': f"ATM CALL with strong OI buildup and volume.{volume_reason}"
-                    })
-            
-            # Analyze PUT side with similar enhancements
-            if opt['put_oi_chng'] > 0 and opt['put_volume'] > 1000:
-                put_spread = opt['put_ask'] - opt['put_bid']
-                put_spread_pct = put_spread / opt['put_ltp'] if opt['put_ltp'] > 0 else float('inf')
-                
-                if put_spread_pct < 0.05:
-                    # Add market bias factor
-                    market_bias_factor = 1.2 if price_diff_pct > 0 else 0.9  # Favor ITM puts
-                    
-                    # Calculate volume to OI ratio
-                    vol_oi_ratio = opt['put_volume'] / opt['put_oi'] if opt['put_oi'] > 0 else 0
-                    
-                    # Add volume bias to score (negative volume bias boosts puts)
-                    volume_factor = 1 + (abs(volume_bias) / 20) if volume_bias < 0 else 1
-                    
-                    # Enhanced score calculation with volume factor
-                    enhanced_score = calculate_score(
-                        opt['put_oi_chng'], 
-                        opt['put_volume'], 
-                        put_spread_pct, 
-                        opt['put_iv']
-                    ) * market_bias_factor * (1 + min(vol_oi_ratio * 0.1, 0.5)) * volume_factor
-                    
-                    # Create reason text including volume data
-                    volume_reason = ""
-                    if volume_signals and volume_signals.get('volume_signal'):
-                        volume_reason = f" Volume signal: {volume_signals['volume_signal']}"
-                    
-                    atm_opportunities.append({
-                        'type': 'PUT',
-                        'strike': opt['strike'],
-                        'buy_price': opt['put_ask'],
-                        'exit': opt['put_ask'] * 1.5,
-                        'stop_loss': opt['put_bid'] * 0.7,
-                        'oi_chng': opt['put_oi_chng'],
-                        'volume': opt['put_volume'],
-                        'iv': opt['put_iv'],
-                        'score': enhanced_score,
-                        'reason': f"ATM PUT with strong OI buildup and volume.{volume_reason}"
-                    })
-        
-        # OTM Analysis with enhanced scoring
-        elif otm_range[0] < abs(price_diff_pct) <= otm_range[1]:
-            if price_diff_pct > 0:  # OTM CALL
-                if opt['call_oi_chng'] > 0 and opt['call_volume'] > 500:
-                    spread = opt['call_ask'] - opt['call_bid']
-                    spread_pct = spread / opt['call_ltp'] if opt['call_ltp'] > 0 else float('inf')
-                    
-                    if spread_pct < 0.08:
-                        # Calculate risk-reward ratio
-                        risk = opt['call_ask'] - opt['call_bid'] * 0.6
-                        reward = opt['call_ask'] * 2 - opt['call_ask']
-                        risk_reward = reward / risk if risk > 0 else 0
-                        
-                        # Add volume bias to score (positive volume bias boosts calls)
-                        volume_factor = 1 + (volume_bias / 20) if volume_bias > 0 else 1
-                        
-                        # Enhanced score with risk-reward factor and volume
-                        enhanced_score = calculate_score(
-                            opt['call_oi_chng'], 
-                            opt['call_volume'], 
-                            spread_pct, 
-                            opt['call_iv']
-                        ) * min(risk_reward * 0.2, 1.5) * volume_factor
-                        
-                        # Create reason text including volume data
-                        volume_reason = ""
-                        if volume_signals and volume_signals.get('volume_signal'):
-                            volume_reason = f" Volume signal: {volume_signals['volume_signal']}"
-                        
-                        otm_opportunities.append({
-                            'type': 'CALL',
-                            'strike': opt['strike'],
-                            'buy_price': opt['call_ask'],
-                            'exit': opt['call_ask'] * 2,
-                            'stop_loss': opt['call_bid'] * 0.6,
-                            'oi_chng': opt['call_oi_chng'],
-                            'volume': opt['call_volume'],
-                            'iv': opt['call_iv'],
-                            'score': enhanced_score,
-                            'reason': f"OTM CALL with potential momentum, Risk:Reward = 1:{risk_reward:.1f}.{volume_reason}"
-                        })
-            else:  # OTM PUT with enhanced scoring
-                if opt['put_oi_chng'] > 0 and opt['put_volume'] > 500:
-                    spread = opt['put_ask'] - opt['put_bid']
-                    spread_pct = spread / opt['put_ltp'] if opt['put_ltp'] > 0 else float('inf')
-                    
-                    if spread_pct < 0.08:
-                        # Calculate risk-reward ratio
-                        risk = opt['put_ask'] - opt['put_bid'] * 0.6
-                        reward = opt['put_ask'] * 2 - opt['put_ask']
-                        risk_reward = reward / risk if risk > 0 else 0
-                        
-                        # Add volume bias to score (negative volume bias boosts puts)
-                        volume_factor = 1 + (abs(volume_bias) / 20) if volume_bias < 0 else 1
-                        
-                        # Enhanced score with risk-reward factor and volume
-                        enhanced_score = calculate_score(
-                            opt['put_oi_chng'], 
-                            opt['put_volume'], 
-                            spread_pct, 
-                            opt['put_iv']
-                        ) * min(risk_reward * 0.2, 1.5) * volume_factor
-                        
-                        # Create reason text including volume data
-                        volume_reason = ""
-                        if volume_signals and volume_signals.get('volume_signal'):
-                            volume_reason = f" Volume signal: {volume_signals['volume_signal']}"
-                        
-                        otm_opportunities.append({
-                            'type': 'PUT',
-                            'strike': opt['strike'],
-                            'buy_price': opt['put_ask'],
-                            'exit': opt['put_ask'] * 2,
-                            'stop_loss': opt['put_bid'] * 0.6,
-                            'oi_chng': opt['put_oi_chng'],
-                            'volume': opt['put_volume'],
-                            'iv': opt['put_iv'],
-                            'score': enhanced_score,
-                            'reason': f"OTM PUT with potential momentum, Risk:Reward = 1:{risk_reward:.1f}.{volume_reason}"
-                        })
+    # Positive volume bias boosts calls, negative volume bias boosts puts
+    call_volume_factor = 1 + (volume_bias / 20) if volume_bias > 0 else 1
+    put_volume_factor = 1 + (abs(volume_bias) / 20) if volume_bias < 0 else 1
     
-    # Sort opportunities by score
-    atm_opportunities.sort(key=lambda x: x['score'], reverse=True)
-    otm_opportunities.sort(key=lambda x: x['score'], reverse=True)
+    # Create reason text including volume data
+    volume_reason = ""
+    if volume_signals and volume_signals.get('volume_signal'):
+        volume_reason = f" Volume signal: {volume_signals['volume_signal']}"
     
-    # Get the absolute best trade
+    # ATM Analysis (within ±2% of current price), scored for both sides at once
+    atm = np.abs(price_diff_pct) <= atm_range
+    call_rows, call_scores = _atm_side_scores(soa, atm, price_diff_pct, 'call', call_volume_factor)
+    put_rows, put_scores = _atm_side_scores(soa, atm, price_diff_pct, 'put', put_volume_factor)
+    
+    # Rank by score; ties keep chain order with the CALL ahead of the PUT.
+    # Only the top two are returned, so only those become dicts
+    rows = np.concatenate((call_rows, put_rows))
+    scores = np.concatenate((call_scores, put_scores))
+    is_put = np.repeat((False, True), (call_rows.size, put_rows.size))
+    for k in _top_k(scores, 2, rows, is_put):
+        side, trade_type = ('put', 'PUT') if is_put[k] else ('call', 'CALL')
+        opt = options[rows[k]]
+        atm_opportunities.append({
+            'type': trade_type,
+            'strike': opt['strike'],
+            'buy_price': opt[f'{side}_ask'],
+            'exit': opt[f'{side}_ask'] * 1.5,
+            'stop_loss': opt[f'{side}_bid'] * 0.7,
+            'oi_chng': opt[f'{side}_oi_chng'],
+            'volume': opt[f'{side}_volume'],
+            'iv': opt[f'{side}_iv'],
+            'score': float(scores[k]),
+            'reason': f"ATM {trade_type} with strong OI buildup and volume.{volume_reason}"
+        })
+    
+    # OTM Analysis (2-10% away), scored with risk-reward for both sides at once
+    distance = np.abs(price_diff_pct)
+    otm = (otm_range[0] < distance) & (distance <= otm_range[1])
+    call_rows, call_scores, call_rr = _otm_side_scores(soa, otm & (price_diff_pct > 0), 'call',
+                                                       call_volume_factor)
+    put_rows, put_scores, put_rr = _otm_side_scores(soa, otm & (price_diff_pct <= 0), 'put',
+                                                    put_volume_factor)
+    
+    # A strike is OTM for one side only, so chain order alone breaks ties
+    rows = np.concatenate((call_rows, put_rows))
+    scores = np.concatenate((call_scores, put_scores))
+    risk_reward = np.concatenate((call_rr, put_rr))
+    is_put = np.repeat((False, True), (call_rows.size, put_rows.size))
+    for k in _top_k(scores, 2, rows):
+        side, trade_type = ('put', 'PUT') if is_put[k] else ('call', 'CALL')
+        opt = options[rows[k]]
+        otm_opportunities.append({
+            'type': trade_type,
+            'strike': opt['strike'],
+            'buy_price': opt[f'{side}_ask'],
+            'exit': opt[f'{side}_ask'] * 2,
+            'stop_loss': opt[f'{side}_bid'] * 0.6,
+            'oi_chng': opt[f'{side}_oi_chng'],
+            'volume': opt[f'{side}_volume'],
+            'iv': opt[f'{side}_iv'],
+            'score': float(scores[k]),
+            'reason': (f"OTM {trade_type} with potential momentum, "
+                       f"Risk:Reward = 1:{risk_reward[k]:.1f}.{volume_reason}")
+        })
+    
+    # The absolute best trade leads one of the two ranked lists
     all_opportunities = atm_opportunities + otm_opportunities
     all_opportunities.sort(key=lambda x: x['score'], reverse=True)
     
     return {
         'best_overall': all_opportunities[:1],  # The single best trade
-        'best_atm': atm_opportunities[:2],      # Top 2 ATM opportunities
-        'best_otm': otm_opportunities[:2]       # Top 2 OTM opportunities
+        'best_atm': atm_opportunities,          # Top 2 ATM opportunities
+        'best_otm': otm_opportunities           # Top 2 OTM opportunities
     }
 
-def calculate_score(oi_change: float, volume: float, spread_pct: float, iv: float) -> float:
-    """Calculate a score for ranking trade opportunities."""
-    oi_score = min(oi_change / 1000, 10)  # Cap at 10
-    volume_score = min(volume / 5000, 10)  # Cap at 10
-    spread_score = max(10 - (spread_pct * 100), 0)  # Lower spread is better
-    iv_score = min(iv / 5, 10)  # Cap at 10
+def calculate_scores(oi_change: np.ndarray, volume: np.ndarray, spread_pct: np.ndarray,
+                     iv: np.ndarray) -> np.ndarray:
+    """Calculate ranking scores for arrays of trade opportunities."""
+    oi_score = np.minimum(oi_change / 1000, 10)  # Cap at 10
+    volume_score = np.minimum(volume / 5000, 10)  # Cap at 10
+    spread_score = np.maximum(10 - (spread_pct * 100), 0)  # Lower spread is better
+    iv_score = np.minimum(iv / 5, 10)  # Cap at 10
     
     # Weighted scoring
     return (oi_score * 0.4 +        # 40% weight to OI change
@@ -462,31 +656,31 @@ def calculate_score(oi_change: float, volume: float, spread_pct: float, iv: floa
             spread_score * 0.2 +     # 20% weight to spread
             iv_score * 0.1)         # 10% weight to IV
 
+# Buy/sell quantities move intraday while daily history only gains a row a
+# day, so repeat analyses of a symbol reuse these for a while
+VOLUME_CACHE_TTL = 60
+HISTORICAL_VOLUME_CACHE_TTL = 300
+
+@ttl_cache(ttl=VOLUME_CACHE_TTL, maxsize=512, cache_if=lambda result: result['success'])
 def fetch_volume_data(symbol: str) -> Dict:
     """Fetch volume inflow/outflow data for a given stock from NSE."""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        session = requests.Session()
-        # Get cookies first
-        session.get("https://www.nseindia.com", headers=headers)
-        
         # For indices, we need to use a different approach
-        if symbol in ["NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY"]:
+        if symbol in INDEX_SYMBOLS:
             # For indices, we'll use the advances/declines data as a proxy for inflow/outflow
             url = "https://www.nseindia.com/api/equity-stockIndices?index=SECURITIES%20IN%20F%26O"
+            params = None
         else:
             # For individual stocks, fetch the stock quote data
-            url = f"https://www.nseindia.com/api/quote-equity?symbol={symbol}"
+            url = "https://www.nseindia.com/api/quote-equity"
+            params = {'symbol': symbol}
         
-        response = session.get(url, headers=headers)
+        response = nse_get(url, params)
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             
-            if symbol in ["NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY"]:
+            if symbol in INDEX_SYMBOLS:
                 # For indices, calculate the inflow/outflow based on advances vs declines
                 advances = data.get('advance', {}).get('advances', 0)
                 declines = data.get('advance', {}).get('declines', 0)
@@ -553,17 +747,10 @@ def fetch_volume_data(symbol: str) -> Dict:
             'error': str(e)
         }
 
+@ttl_cache(ttl=HISTORICAL_VOLUME_CACHE_TTL, maxsize=512, cache_if=lambda result: result['success'])
 def fetch_historical_volume(symbol: str, days: int = 5) -> Dict:
     """Fetch historical volume data for trend analysis."""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        session = requests.Session()
-        # Get cookies first
-        session.get("https://www.nseindia.com", headers=headers)
-        
         # Calculate date range
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
@@ -572,7 +759,7 @@ def fetch_historical_volume(symbol: str, days: int = 5) -> Dict:
         from_date = start_date.strftime('%d-%m-%Y')
         to_date = end_date.strftime('%d-%m-%Y')
         
-        if symbol in ["NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY"]:
+        if symbol in INDEX_SYMBOLS:
             # For indices
             index_map = {
                 "NIFTY": "NIFTY 50",
@@ -581,15 +768,17 @@ def fetch_historical_volume(symbol: str, days: int = 5) -> Dict:
                 "MIDCPNIFTY": "NIFTY MIDCAP SELECT"
             }
             index_name = index_map.get(symbol, "NIFTY 50")
-            url = f"https://www.nseindia.com/api/historical/indicesHistory?indexType={index_name}&from={from_date}&to={to_date}"
+            url = "https://www.nseindia.com/api/historical/indicesHistory"
+            params = {'indexType': index_name, 'from': from_date, 'to': to_date}
         else:
             # For stocks
-            url = f"https://www.nseindia.com/api/historical/cm/equity?symbol={symbol}&from={from_date}&to={to_date}"
+            url = "https://www.nseindia.com/api/historical/cm/equity"
+            params = {'symbol': symbol, 'from': from_date, 'to': to_date}
         
-        response = session.get(url, headers=headers)
+        response = nse_get(url, params)
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             
             # Extract historical data
             history = data.get('data', [])
@@ -694,26 +883,43 @@ def analyze_volume_signals(volume_data: Dict) -> Dict:
     
     return signals
 
+def _class_xpath(path: str, css_class: str) -> etree.XPath:
+    """Compile an XPath matching ``path`` elements that carry ``css_class``."""
+    return etree.XPath(f"{path}[contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')]")
+
+# News page selectors, compiled once instead of walking the tree per call
+_MC_STOCK_NEWS_ITEMS = _class_xpath('//div', 'item')
+_MC_MARKET_NEWS_ITEMS = _class_xpath('//li', 'clearfix')
+_ET_NEWS_ITEMS = _class_xpath('//div', 'eachStory')
+_DATE_SPANS = _class_xpath('.//span', 'date')
+
+def _select_html(content: bytes, selector: etree.XPath) -> list:
+    """Parse an HTML page with lxml and return the elements matched by selector."""
+    if not content.strip():
+        return []
+    return selector(lxml_html.fromstring(content))
+
+def _first(elements: list):
+    """First element of an XPath result, or None."""
+    return elements[0] if elements else None
+
+# Stock headlines change far slower than prices, so every chain refresh
+# within this window reuses the last scrape instead of refetching it
+STOCK_NEWS_CACHE_TTL = 300
+
+@ttl_cache(ttl=STOCK_NEWS_CACHE_TTL, maxsize=512, cache_if=lambda result: result['success'])
 def fetch_stock_news(symbol: str) -> Dict:
     """Fetch latest news for a given stock symbol."""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
         # Try multiple sources for news
         news_items = []
         
-        # 1. Try NSE website news
-        session = requests.Session()
-        session.get("https://www.nseindia.com", headers=headers)
-        
-        # NSE company info API
-        nse_url = f"https://www.nseindia.com/api/quote-equity?symbol={symbol}"
-        response = session.get(nse_url, headers=headers)
+        # 1. Try NSE website news (company info API)
+        nse_url = "https://www.nseindia.com/api/quote-equity"
+        response = nse_get(nse_url, {'symbol': symbol})
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             if 'news' in data:
                 for news in data.get('news', [])[:3]:  # Get latest 3 news items
                     news_items.append({
@@ -725,30 +931,26 @@ def fetch_stock_news(symbol: str) -> Dict:
         
         # 2. Try MoneyControl (as backup)
         if len(news_items) < 3:
-            mc_url = f"https://www.moneycontrol.com/stocks/company_info/stock_news.php?sc_id={symbol}"
-            response = requests.get(mc_url, headers=headers)
+            mc_url = "https://www.moneycontrol.com/stocks/company_info/stock_news.php"
+            response = WEB_SESSION.get(mc_url, params={'sc_id': symbol}, timeout=NSE_TIMEOUT)
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                news_divs = soup.find_all('div', class_='item')
+                news_divs = _select_html(response.content, _MC_STOCK_NEWS_ITEMS)
                 
                 for news in news_divs[:3]:
-                    title = news.find('h3')
-                    date = news.find('span', class_='date')
-                    if title and date:
+                    title = news.find('.//h3')
+                    date = _first(_DATE_SPANS(news))
+                    if title is not None and date is not None:
+                        link = news.find('.//a')
                         news_items.append({
-                            'title': title.text.strip(),
-                            'date': date.text.strip(),
+                            'title': title.text_content().strip(),
+                            'date': date.text_content().strip(),
                             'source': 'MoneyControl',
-                            'url': news.find('a')['href'] if news.find('a') else ''
+                            'url': link.get('href', '') if link is not None else ''
                         })
         
         # Analyze sentiment for each news item
-        for item in news_items:
-            sentiment = analyze_news_sentiment(item['title'])
-            item['sentiment'] = sentiment['sentiment']
-            item['sentiment_score'] = sentiment['score']
-            item['impact_factors'] = sentiment['impact_factors']
+        score_news(news_items)
         
         return {
             'success': True,
@@ -764,24 +966,46 @@ def fetch_stock_news(symbol: str) -> Dict:
             'news': []
         }
 
+# Keywords for sentiment analysis, matched as substrings of the lowercased text
+BULLISH_KEYWORDS = (
+    'surge', 'jump', 'rise', 'gain', 'up', 'higher', 'boost', 'growth', 'profit',
+    'positive', 'strong', 'beat', 'exceed', 'upgrade', 'buy', 'bullish', 'record',
+    'partnership', 'launch', 'expansion', 'innovation', 'contract', 'win', 'success'
+)
+
+BEARISH_KEYWORDS = (
+    'fall', 'drop', 'decline', 'down', 'lower', 'loss', 'weak', 'miss', 'below',
+    'downgrade', 'sell', 'bearish', 'cut', 'reduce', 'risk', 'concern', 'debt',
+    'investigation', 'lawsuit', 'penalty', 'fine', 'delay', 'recall', 'dispute'
+)
+
+# Specific high-impact patterns, checked against the lowercased text
+IMPACT_PATTERNS = (
+    ('Earnings/Results', re.compile(r'quarter|q[1-4]|results|earnings')),
+    ('Corporate Action', re.compile(r'dividend|bonus|split')),
+    ('Business Development', re.compile(r'contract|deal|order|agreement')),
+    ('Management Changes', re.compile(r'ceo|director|board|management')),
+    ('M&A Activity', re.compile(r'stake|acquire|merge|buy')),
+)
+
 def analyze_news_sentiment(text: str) -> Dict:
     """Analyze the sentiment of news text."""
-    # Keywords for sentiment analysis
-    bullish_keywords = [
-        'surge', 'jump', 'rise', 'gain', 'up', 'higher', 'boost', 'growth', 'profit',
-        'positive', 'strong', 'beat', 'exceed', 'upgrade', 'buy', 'bullish', 'record',
-        'partnership', 'launch', 'expansion', 'innovation', 'contract', 'win', 'success'
-    ]
-    
-    bearish_keywords = [
-        'fall', 'drop', 'decline', 'down', 'lower', 'loss', 'weak', 'miss', 'below',
-        'downgrade', 'sell', 'bearish', 'cut', 'reduce', 'risk', 'concern', 'debt',
-        'investigation', 'lawsuit', 'penalty', 'fine', 'delay', 'recall', 'dispute'
-    ]
+    sentiment, sentiment_score, impact_factors = _score_text(text)
+    return {
+        'sentiment': sentiment,
+        'score': sentiment_score,
+        'impact_factors': list(impact_factors)
+    }
+
+# The same headlines recur across stock news, market news and refreshes
+@lru_cache(maxsize=4096)
+def _score_text(text: str) -> Tuple[str, float, Tuple[str, ...]]:
+    """Sentiment, score and impact factors of a piece of text."""
+    text = text.lower()
     
     # Count occurrences
-    bullish_count = sum(1 for word in bullish_keywords if word.lower() in text.lower())
-    bearish_count = sum(1 for word in bearish_keywords if word.lower() in text.lower())
+    bullish_count = sum(1 for word in BULLISH_KEYWORDS if word in text)
+    bearish_count = sum(1 for word in BEARISH_KEYWORDS if word in text)
     
     # Calculate sentiment score (-1 to 1)
     total_keywords = bullish_count + bearish_count
@@ -799,25 +1023,18 @@ def analyze_news_sentiment(text: str) -> Dict:
         sentiment = 'Neutral'
     
     # Identify impact factors
-    impact_factors = []
-    
-    # Check for specific high-impact patterns
-    if re.search(r'quarter|q[1-4]|results|earnings', text.lower()):
-        impact_factors.append('Earnings/Results')
-    if re.search(r'dividend|bonus|split', text.lower()):
-        impact_factors.append('Corporate Action')
-    if re.search(r'contract|deal|order|agreement', text.lower()):
-        impact_factors.append('Business Development')
-    if re.search(r'ceo|director|board|management', text.lower()):
-        impact_factors.append('Management Changes')
-    if re.search(r'stake|acquire|merge|buy', text.lower()):
-        impact_factors.append('M&A Activity')
+    impact_factors = tuple(label for label, pattern in IMPACT_PATTERNS if pattern.search(text))
     
-    return {
-        'sentiment': sentiment,
-        'score': sentiment_score,
-        'impact_factors': impact_factors
-    }
+    return sentiment, sentiment_score, impact_factors
+
+def score_news(news_items: List[Dict]) -> List[Dict]:
+    """Annotate news items in place with their sentiment, score and impact factors."""
+    for item in news_items:
+        sentiment = analyze_news_sentiment(item['title'])
+        item['sentiment'] = sentiment['sentiment']
+        item['sentiment_score'] = sentiment['score']
+        item['impact_factors'] = sentiment['impact_factors']
+    return news_items
 
 def calculate_overall_sentiment(news_items: List[Dict]) -> Dict:
     """Calculate overall sentiment from multiple news items."""
@@ -849,19 +1066,18 @@ def calculate_overall_sentiment(news_items: List[Dict]) -> Dict:
         sentiment = 'Neutral'
     
     # Calculate confidence based on consistency of sentiment
-    sentiments = [item['sentiment'] for item in news_items]
-    if len(set(sentiments)) == 1:
+    distinct_sentiments = len({item['sentiment'] for item in news_items})
+    if distinct_sentiments == 1:
         confidence = 'High'
-    elif len(set(sentiments)) == 2:
+    elif distinct_sentiments == 2:
         confidence = 'Medium'
     else:
         confidence = 'Low'
     
-    # Generate summary
-    impact_factors = []
-    for item in news_items:
-        impact_factors.extend(item['impact_factors'])
-    impact_factors = list(set(impact_factors))  # Remove duplicates
+    # Generate summary, listing factors in the order the news raised them
+    impact_factors = list(dict.fromkeys(
+        chain.from_iterable(item['impact_factors'] for item in news_items)
+    ))
     
     summary = f"{sentiment} sentiment with {confidence.lower()} confidence"
     if impact_factors:
@@ -877,24 +1093,16 @@ def calculate_overall_sentiment(news_items: List[Dict]) -> Dict:
 def fetch_option_chain(symbol: str) -> Dict:
     """Fetch option chain data for a given symbol."""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        session = requests.Session()
-        # Get cookies first
-        session.get("https://www.nseindia.com", headers=headers)
-        
         # Different URL format for indices vs stocks
-        if symbol in ["NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY"]:
-            url = f"https://www.nseindia.com/api/option-chain-indices?symbol={symbol}"
+        if symbol in INDEX_SYMBOLS:
+            url = "https://www.nseindia.com/api/option-chain-indices"
         else:
-            url = f"https://www.nseindia.com/api/option-chain-equities?symbol={symbol}"
+            url = "https://www.nseindia.com/api/option-chain-equities"
         
-        response = session.get(url, headers=headers)
+        response = nse_get(url, {'symbol': symbol})
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             
             # Extract current price and timestamp
             current_price = data['records']['underlyingValue']
@@ -945,98 +1153,123 @@ def fetch_option_chain(symbol: str) -> Dict:
             'symbol': symbol
         }
 
+def fetch_option_chains(symbols: List[str]) -> Dict[str, Dict]:
+    """Fetch option chains for several symbols concurrently.
+
+    Must not be called from a task already running on _IO_POOL.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    return dict(zip(symbols, _IO_POOL.map(fetch_option_chain, symbols)))
+
+def _fetch_nse_market_news() -> List[Dict]:
+    """Market status messages from NSE."""
+    news_items = []
+    nse_url = "https://www.nseindia.com/api/marketStatus"
+    response = nse_get(nse_url)
+    
+    if response.status_code == 200:
+        data = orjson.loads(response.content)
+        if 'marketState' in data:
+            today = datetime.now().strftime('%Y-%m-%d')
+            for item in data.get('marketState', []):
+                if 'marketStatusMessage' in item:
+                    news_items.append({
+                        'title': item['marketStatusMessage'],
+                        'source': 'NSE',
+                        'date': today,
+                        'type': 'Market Update'
+                    })
+    return news_items
+
+def _fetch_moneycontrol_news() -> List[Dict]:
+    """Top market news from MoneyControl."""
+    news_items = []
+    mc_url = "https://www.moneycontrol.com/news/business/markets/"
+    response = WEB_SESSION.get(mc_url, timeout=NSE_TIMEOUT)
+    
+    if response.status_code == 200:
+        news_divs = _select_html(response.content, _MC_MARKET_NEWS_ITEMS)
+        
+        for news in news_divs[:10]:  # Get top 10 news items
+            title_elem = news.find('.//h2')
+            if title_elem is not None:
+                title = title_elem.text_content().strip()
+                link_elem = title_elem.find('.//a')
+                link = link_elem.get('href', '') if link_elem is not None else ''
+                date_elem = _first(_DATE_SPANS(news))
+                date = date_elem.text_content().strip() if date_elem is not None else ''
+                
+                news_items.append({
+                    'title': title,
+                    'source': 'MoneyControl',
+                    'date': date,
+                    'url': link,
+                    'type': 'Market News'
+                })
+    return news_items
+
+def _fetch_et_news() -> List[Dict]:
+    """Market news from Economic Times."""
+    news_items = []
+    et_url = "https://economictimes.indiatimes.com/markets"
+    response = WEB_SESSION.get(et_url, timeout=NSE_TIMEOUT)
+    
+    if response.status_code == 200:
+        news_divs = _select_html(response.content, _ET_NEWS_ITEMS)
+        today = datetime.now().strftime('%Y-%m-%d')
+        
+        for news in news_divs[:10]:
+            title_elem = news.find('.//h3')
+            if title_elem is not None:
+                title = title_elem.text_content().strip()
+                link_elem = title_elem.find('.//a')
+                link = 'https://economictimes.indiatimes.com' + link_elem.get('href', '') if link_elem is not None else ''
+                
+                news_items.append({
+                    'title': title,
+                    'source': 'Economic Times',
+                    'date': today,
+                    'url': link,
+                    'type': 'Market News'
+                })
+    return news_items
+
+# Candidate ticker symbols in a headline: standalone uppercase words
+TICKER_PATTERN = re.compile(r'\b[A-Z]{2,}\b')
+
+# fetch_market_news itself runs on _IO_POOL, so its sources get their own
+# workers rather than waiting on tasks queued behind it in the same pool
+_NEWS_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='news')
+
+# Market news is the same for every symbol, so scrape it at most once a minute
+@ttl_cache(ttl=60, maxsize=1, cache_if=lambda result: result['success'])
 def fetch_market_news() -> Dict:
     """Fetch and analyze market news from multiple sources."""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        news_items = []
         stock_mentions = {}
         
-        # 1. NSE Market News
-        session = requests.Session()
-        session.get("https://www.nseindia.com", headers=headers)
-        nse_url = "https://www.nseindia.com/api/marketStatus"
-        response = session.get(nse_url, headers=headers)
+        # The sources are independent, so fetch them concurrently along with
+        # the F&O list needed to spot stock mentions
+        source_futures = [
+            _NEWS_POOL.submit(fetch_source)
+            for fetch_source in (_fetch_nse_market_news, _fetch_moneycontrol_news, _fetch_et_news)
+        ]
+        fno_future = _NEWS_POOL.submit(get_fno_symbol_set)
+        news_items = [item for future in source_futures for item in future.result()]
         
-        if response.status_code == 200:
-            data = response.json()
-            if 'marketState' in data:
-                for item in data.get('marketState', []):
-                    if 'marketStatusMessage' in item:
-                        news_items.append({
-                            'title': item['marketStatusMessage'],
-                            'source': 'NSE',
-                            'date': datetime.now().strftime('%Y-%m-%d'),
-                            'type': 'Market Update'
-                        })
-        
-        # 2. MoneyControl Top News
-        mc_url = "https://www.moneycontrol.com/news/business/markets/"
-        response = requests.get(mc_url, headers=headers)
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            news_divs = soup.find_all('li', class_='clearfix')
-            
-            for news in news_divs[:10]:  # Get top 10 news items
-                title_elem = news.find('h2')
-                if title_elem:
-                    title = title_elem.text.strip()
-                    link = title_elem.find('a')['href'] if title_elem.find('a') else ''
-                    date_elem = news.find('span', class_='date')
-                    date = date_elem.text.strip() if date_elem else ''
-                    
-                    news_items.append({
-                        'title': title,
-                        'source': 'MoneyControl',
-                        'date': date,
-                        'url': link,
-                        'type': 'Market News'
-                    })
-        
-        # 3. Economic Times Markets
-        et_url = "https://economictimes.indiatimes.com/markets"
-        response = requests.get(et_url, headers=headers)
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            news_divs = soup.find_all('div', class_='eachStory')
-            
-            for news in news_divs[:10]:
-                title_elem = news.find('h3')
-                if title_elem:
-                    title = title_elem.text.strip()
-                    link = 'https://economictimes.indiatimes.com' + title_elem.find('a')['href'] if title_elem.find('a') else ''
-                    
-                    news_items.append({
-                        'title': title,
-                        'source': 'Economic Times',
-                        'date': datetime.now().strftime('%Y-%m-%d'),
-                        'url': link,
-                        'type': 'Market News'
-                    })
-        
-        # Process news items and extract stock mentions
-        fno_stocks = fetch_fno_stocks()
-        for news in news_items:
-            # Analyze sentiment
-            sentiment = analyze_news_sentiment(news['title'])
-            news['sentiment'] = sentiment['sentiment']
-            news['sentiment_score'] = sentiment['score']
-            news['impact_factors'] = sentiment['impact_factors']
-            
-            # Find stock mentions
-            words = re.findall(r'\b[A-Z]+\b', news['title'])
-            for word in words:
+        # Score each headline once, then extract stock mentions carrying
+        # that score so per-symbol consumers never rescore them
+        fno_stocks = fno_future.result()
+        for news in score_news(news_items):
+            # Find stock mentions, once per symbol per headline and in the
+            # order they appear
+            for word in dict.fromkeys(TICKER_PATTERN.findall(news['title'])):
                 if word in fno_stocks:
-                    if word not in stock_mentions:
-                        stock_mentions[word] = []
-                    stock_mentions[word].append({
+                    stock_mentions.setdefault(word, []).append({
                         'title': news['title'],
-                        'sentiment': sentiment['sentiment'],
+                        'sentiment': news['sentiment'],
+                        'sentiment_score': news['sentiment_score'],
+                        'impact_factors': news['impact_factors'],
                         'source': news['source'],
                         'date': news['date']
                     })
@@ -1045,6 +1278,7 @@ def fetch_market_news() -> Dict:
             'success': True,
             'news': news_items,
             'stock_mentions': stock_mentions,
+            'sector_analysis': analyze_sector_sentiment(stock_mentions),
             'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         
@@ -1054,34 +1288,78 @@ def fetch_market_news() -> Dict:
             'success': False,
             'error': str(e),
             'news': [],
-            'stock_mentions': {}
+            'stock_mentions': {},
+            'sector_analysis': {}
         }
 
-def get_enhanced_option_chain(symbol: str) -> Dict:
-    """Get enhanced option chain with news and volume data."""
+# Sector reported for symbols missing from STOCK_TO_SECTOR
+UNKNOWN_SECTOR = 'Others'
+
+@lru_cache(maxsize=512)
+def get_stock_sector(symbol: str) -> str:
+    """Return the sector a stock belongs to."""
+    return STOCK_TO_SECTOR.get(symbol, UNKNOWN_SECTOR)
+
+def analyze_sector_sentiment(stock_mentions: Dict[str, List[Dict]]) -> Dict:
+    """Aggregate news sentiment of mentioned stocks by sector."""
+    sector_analysis = defaultdict(lambda: {
+        'bullish_count': 0,
+        'bearish_count': 0,
+        'neutral_count': 0,
+        'stocks_mentioned': set()
+    })
+    
+    for stock, mentions in stock_mentions.items():
+        sector_data = sector_analysis[get_stock_sector(stock)]
+        counts = Counter(mention['sentiment'] for mention in mentions)
+        sector_data['bullish_count'] += counts['Bullish']
+        sector_data['bearish_count'] += counts['Bearish']
+        sector_data['neutral_count'] += counts['Neutral']
+        sector_data['stocks_mentioned'].add(stock)
+    
+    # Overall sentiment of each sector
+    for sector_data in sector_analysis.values():
+        if sector_data['bullish_count'] > sector_data['bearish_count']:
+            sector_data['sentiment'] = 'Bullish'
+        elif sector_data['bearish_count'] > sector_data['bullish_count']:
+            sector_data['sentiment'] = 'Bearish'
+        else:
+            sector_data['sentiment'] = 'Neutral'
+    
+    return dict(sector_analysis)
+
+def get_enhanced_option_chain(symbol: str, market_news: Optional[Dict] = None) -> Dict:
+    """Get enhanced option chain with news and volume data.
+    
+    Pass market_news to reuse an already fetched fetch_market_news() result.
+    """
     try:
-        # Fetch option chain data
-        option_data = fetch_option_chain(symbol)
+        # The upstream fetches are independent network calls, so run them
+        # concurrently and only wait for the slowest one
+        option_future = _IO_POOL.submit(fetch_option_chain, symbol)
+        volume_future = _IO_POOL.submit(fetch_volume_data, symbol)
+        news_future = _IO_POOL.submit(fetch_stock_news, symbol)
+        if market_news is None:
+            market_future = _IO_POOL.submit(fetch_market_news)
+        
+        option_data = option_future.result()
         if not option_data['success']:
             return option_data
         
-        # Fetch volume data
-        volume_data = fetch_volume_data(symbol)
-        
-        # Fetch stock-specific news
-        news_data = fetch_stock_news(symbol)
+        volume_data = volume_future.result()
+        news_data = news_future.result()
         
-        # Fetch market news and check for mentions of the symbol
-        market_news = fetch_market_news()
+        # Check market news for mentions of the symbol
+        if market_news is None:
+            market_news = market_future.result()
         symbol_mentions = market_news.get('stock_mentions', {}).get(symbol, [])
         
-        # Combine all news
+        # Combine all news, sorted by date (most recent first). Build a new
+        # list so the cached market news mentions are never reordered
         if news_data['success']:
             all_news = news_data['news'] + symbol_mentions
         else:
-            all_news = symbol_mentions
-            
-        # Sort news by date (most recent first)
+            all_news = list(symbol_mentions)
         all_news.sort(key=lambda x: x.get('date', ''), reverse=True)
         
         # Calculate overall sentiment including market news
@@ -1099,6 +1377,7 @@ def get_enhanced_option_chain(symbol: str) -> Dict:
                 'market_mentions': symbol_mentions,
                 'overall_sentiment': overall_sentiment
             },
+            'market_news': market_news,
             'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         
@@ -1108,6 +1387,20 @@ def get_enhanced_option_chain(symbol: str) -> Dict:
             'error': str(e)
         }
 
+# Per-symbol builds wait on _IO_POOL fetches, so they run on their own
+# workers to keep a large batch from starving that pool
+_BATCH_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix='chain-batch')
+
+def get_enhanced_option_chains(symbols: List[str]) -> Dict[str, Dict]:
+    """Get enhanced option chains for several symbols concurrently.
+    
+    Market news is fetched once up front and handed to every symbol, so the
+    sources are scraped once per batch even when that fetch fails.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    market_news = fetch_market_news()
+    return dict(zip(symbols, _BATCH_POOL.map(get_enhanced_option_chain, symbols, repeat(market_news))))
+
 def main():
     try:
         # Fetch real-time data for FnO stocks
@@ -1123,58 +1416,47 @@ def main():
             print("No valid data found.")
             return
 
-        key_strike = find_max_put_oi_strike(options)
-        calls = analyze_calls(options, current_price)
-        puts = analyze_puts(options, current_price)
-        otm_calls = analyze_otm_calls(options, current_price)
-
-        print_results(key_strike, calls, puts, otm_calls)
+        levels = analyze_levels(options, current_price)
+        print_results(levels['key_strike'], levels['calls'], levels['puts'], levels['otm_calls'])
     except Exception as e:
         print(f"An error occurred: {e}")
 
 def fetch_fno_stocks() -> List[str]:
     """Fetch the list of stocks available for F&O trading from NSE."""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        session = requests.Session()
-        # Get cookies first
-        session.get("https://www.nseindia.com", headers=headers)
-        
         # Fetch F&O stocks list
         url = "https://www.nseindia.com/api/equity-stock-derivatives"
-        response = session.get(url, headers=headers)
+        response = nse_get(url)
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             return [stock['symbol'] for stock in data]
     except Exception as e:
         print(f"Error fetching F&O stocks list: {e}")
         return []
 
+# The F&O list changes a few times a year, so mention lookups reuse it for
+# an hour; empty results from failed fetches are retried on the next call
+FNO_SET_CACHE_TTL = 3600
+
+@ttl_cache(ttl=FNO_SET_CACHE_TTL, maxsize=1, cache_if=bool)
+def get_fno_symbol_set() -> frozenset:
+    """F&O stock symbols as a set for constant-time membership checks."""
+    return frozenset(fetch_fno_stocks() or ())
+
 def fetch_real_time_price(symbol: str) -> Dict:
     """Fetch real-time price and trading data for a given F&O stock."""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        session = requests.Session()
-        # Get cookies first
-        session.get("https://www.nseindia.com", headers=headers)
-        
         # Different URL for indices vs stocks
-        if symbol in ["NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY"]:
-            url = f"https://www.nseindia.com/api/option-chain-indices?symbol={symbol}"
+        if symbol in INDEX_SYMBOLS:
+            url = "https://www.nseindia.com/api/option-chain-indices"
         else:
-            url = f"https://www.nseindia.com/api/option-chain-equities?symbol={symbol}"
+            url = "https://www.nseindia.com/api/option-chain-equities"
         
-        response = session.get(url, headers=headers)
+        response = nse_get(url, {'symbol': symbol})
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             
             # Extract relevant data
             current_price = data['records']['underlyingValue']
@@ -1258,42 +1540,73 @@ def get_option_chain(symbol: str, expiry_date: str = None) -> Dict:
             'error': str(e)
         }
 
+def analyze_option_chain(options: List[Dict], current_price: float,
+                         volume_signals: Dict = None, imbalance_limit: Optional[int] = None) -> Dict:
+    """Run the market direction, best trade and imbalance analyses on one chain.
+    
+    Only the imbalance_limit highest-scoring imbalance trades are built when given.
+    """
+    # Convert to arrays and measure strike distances once, sharing them
+    # between the analyses
+    soa = options_to_soa(options)
+    price_diff_pct = _price_diff_pct(soa, current_price)
+    return {
+        'market_direction': _market_direction(soa, _near_mask(price_diff_pct), current_price),
+        'best_trades': _best_trades(options, soa, price_diff_pct, volume_signals),
+        'imbalance_trades': _price_imbalances(options, soa, price_diff_pct, imbalance_limit)
+    }
+
 def analyze_price_imbalances(options: List[Dict], current_price: float) -> List[Dict]:
     """Analyze price imbalances in option chain to identify trading opportunities."""
-    imbalances = []
+    soa = options_to_soa(options)
+    return _price_imbalances(options, soa, _price_diff_pct(soa, current_price))
+
+def _price_imbalances(options: List[Dict], soa: Dict[str, np.ndarray],
+                      price_diff_pct: np.ndarray, limit: Optional[int] = None) -> List[Dict]:
+    """Find call/put price imbalances from the chain rows, their arrays and strike distances."""
+    call_ltp = soa['call_ltp']
+    put_ltp = soa['put_ltp']
     
-    for opt in options:
-        # Skip if no valid prices
-        if opt['call_ltp'] <= 0 or opt['put_ltp'] <= 0:
-            continue
-            
-        # Calculate price ratios and imbalances
-        strike_distance = abs(opt['strike'] - current_price)
-        strike_distance_pct = strike_distance / current_price
-        
-        # Skip strikes too far from current price (>7%)
-        if strike_distance_pct > 0.07:
-            continue
-            
-        call_put_ratio = opt['call_ltp'] / opt['put_ltp']
-        
-        # Check for significant volume
-        min_volume = 500
-        if opt['call_volume'] < min_volume or opt['put_volume'] < min_volume:
-            continue
-            
-        # Calculate bid-ask spreads
-        call_spread = opt['call_ask'] - opt['call_bid']
-        put_spread = opt['put_ask'] - opt['put_bid']
-        
-        # Skip if spreads are too wide (>5% of option price)
-        if (call_spread / opt['call_ltp'] > 0.05 or 
-            put_spread / opt['put_ltp'] > 0.05):
-            continue
-            
-        # Look for price imbalances
-        if call_put_ratio > 1.5:  # Calls relatively expensive
-            score = min((call_put_ratio - 1.5) * 10, 10)  # Score from 0-10
+    # Need valid prices on both sides, a strike within 7% of the current
+    # price and significant volume
+    min_volume = 500
+    mask = (call_ltp > 0) & (put_ltp > 0)
+    mask &= np.abs(price_diff_pct) <= 0.07
+    mask &= soa['call_volume'] >= min_volume
+    mask &= soa['put_volume'] >= min_volume
+    rows = np.nonzero(mask)[0]
+    call_ltp = call_ltp[rows]
+    put_ltp = put_ltp[rows]
+    
+    # Skip if spreads are too wide (>5% of option price)
+    tight = (soa['call_ask'][rows] - soa['call_bid'][rows]) / call_ltp <= 0.05
+    tight &= (soa['put_ask'][rows] - soa['put_bid'][rows]) / put_ltp <= 0.05
+    rows = rows[tight]
+    call_put_ratio = call_ltp[tight] / put_ltp[tight]
+    
+    # Calls relatively expensive favour puts, puts relatively expensive
+    # favour calls; everything in between is fairly priced
+    calls_expensive = call_put_ratio > 1.5
+    imbalanced = calls_expensive | (call_put_ratio < 0.67)
+    rows = rows[imbalanced]
+    call_put_ratio = call_put_ratio[imbalanced]
+    calls_expensive = calls_expensive[imbalanced]
+    raw_scores = np.where(calls_expensive, call_put_ratio - 1.5, 0.67 / call_put_ratio - 1) * 10
+    
+    # Highest score first, keeping chain order on ties. When only the top
+    # few are wanted, select them without sorting the rest
+    scores = np.minimum(raw_scores, 10)
+    if limit is None:
+        order = np.argsort(-scores, kind='stable')
+    else:
+        order = _top_k(scores, limit, rows)
+    
+    imbalances = []
+    for row, ratio, raw_score, is_put in zip(rows[order].tolist(), call_put_ratio[order].tolist(),
+                                             raw_scores[order].tolist(), calls_expensive[order].tolist()):
+        opt = options[row]
+        score = min(raw_score, 10)  # Score from 0-10
+        if is_put:
             imbalances.append({
                 'type': 'PUT',
                 'strike': opt['strike'],
@@ -1301,10 +1614,9 @@ def analyze_price_imbalances(options: List[Dict], current_price: float) -> List[
                 'exit': opt['put_ask'] * 1.5,
                 'stop_loss': opt['put_bid'] * 0.7,
                 'score': score,
-                'reason': f"Calls expensive relative to puts (ratio: {call_put_ratio:.2f})"
+                'reason': f"Calls expensive relative to puts (ratio: {ratio:.2f})"
             })
-        elif call_put_ratio < 0.67:  # Puts relatively expensive
-            score = min((0.67 / call_put_ratio - 1) * 10, 10)  # Score from 0-10
+        else:
             imbalances.append({
                 'type': 'CALL',
                 'strike': opt['strike'],
@@ -1312,11 +1624,8 @@ def analyze_price_imbalances(options: List[Dict], current_price: float) -> List[
                 'exit': opt['call_ask'] * 1.5,
                 'stop_loss': opt['call_bid'] * 0.7,
                 'score': score,
-                'reason': f"Puts expensive relative to calls (ratio: {call_put_ratio:.2f})"
+                'reason': f"Puts expensive relative to calls (ratio: {ratio:.2f})"
             })
-    
-    # Sort by score
-    imbalances.sort(key=lambda x: x['score'], reverse=True)
     return imbalances
 
 if __name__ == "__main__":